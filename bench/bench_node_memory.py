@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from htmlnode import HTMLNode
+from markdown_parser import text_to_textnodes
+from markdown_to_html import markdown_to_html_node
+from textnode import TextNode
+
+inline_samples = [
+    "plain words in a sentence",
+    "**bold words**",
+    "*italic words*",
+    "`inline code`",
+    "[a link](https://example.com/some/page)",
+    "![an image](/images/picture.png)",
+]
+
+
+# dict-backed node layout, as the nodes were before they used __slots__
+class DictNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+def generate_markdown(rng, paragraphs):
+    blocks = ["# Memory benchmark"]
+    for i in range(paragraphs):
+        if i % 5 == 4:
+            items = map(lambda n: f"- item {n} with *style*", range(rng.randint(3, 8)))
+            blocks.append("\n".join(items))
+        else:
+            blocks.append(" ".join(rng.choice(inline_samples) for _ in range(20)))
+    return "\n\n".join(blocks)
+
+
+def walk(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        if node.children:
+            stack.extend(node.children)
+
+
+def traced_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(objects)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes per parsed node")
+    parser.add_argument("--paragraphs", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    markdown = generate_markdown(random.Random(args.seed), args.paragraphs)
+    text_nodes = text_to_textnodes(markdown.replace("\n\n", " "))
+    html_nodes = list(walk(markdown_to_html_node(markdown)))
+    print(
+        f"document: {len(markdown) / 1e6:.1f} MB, {len(text_nodes)} text nodes, "
+        f"{len(html_nodes)} html nodes"
+    )
+
+    rows = [
+        (
+            "TextNode",
+            lambda: [TextNode(n.text, n.text_type, n.url) for n in text_nodes],
+            lambda: [DictTextNode(n.text, n.text_type, n.url) for n in text_nodes],
+        ),
+        (
+            "HTMLNode",
+            lambda: [HTMLNode(n.tag, n.value, n.children, n.props) for n in html_nodes],
+            lambda: [DictNode(n.tag, n.value, n.children, n.props) for n in html_nodes],
+        ),
+    ]
+    print(f"{'node':<10}{'dict-backed':>16}{'__slots__':>16}{'saved':>8}")
+    for name, build_slots, build_dict in rows:
+        slots_bytes = traced_bytes(build_slots)
+        dict_bytes = traced_bytes(build_dict)
+        print(
+            f"{name:<10}{dict_bytes:>10.1f} B/node{slots_bytes:>10.1f} B/node"
+            f"{1 - slots_bytes / dict_bytes:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
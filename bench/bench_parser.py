@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from corpus import corpus_kinds, generate_corpus
+from markdown_block_parser import block_to_block_type, text_to_blocks
+from markdown_parser import text_to_textnodes
+from markdown_to_html import markdown_to_html_node
+
+
+def count_html_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+def stages(markdown):
+    blocks = text_to_blocks(markdown)
+    root = markdown_to_html_node(markdown)
+    html_node_count = count_html_nodes(root)
+    text_node_count = sum(map(lambda block: len(text_to_textnodes(block)), blocks))
+    # each stage: (name, function to time, nodes it produces)
+    return [
+        ("text_to_blocks", lambda: text_to_blocks(markdown), len(blocks)),
+        (
+            "block_to_block_type",
+            lambda: list(map(block_to_block_type, blocks)),
+            len(blocks),
+        ),
+        (
+            "text_to_textnodes",
+            lambda: list(map(text_to_textnodes, blocks)),
+            text_node_count,
+        ),
+        (
+            "markdown_to_html_node",
+            lambda: markdown_to_html_node(markdown),
+            html_node_count,
+        ),
+        ("to_html", root.to_html, html_node_count),
+    ]
+
+
+def best_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure parser throughput per stage on generated corpora"
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=corpus_kinds,
+        help="Corpus to run, can be repeated (default: all)",
+    )
+    parser.add_argument("--size", type=int, default=1_000_000, help="bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'corpus':<18}{'stage':<24}{'time':>12}{'MB/s':>10}{'nodes':>10}{'ns/node':>10}"
+    )
+    for kind in args.corpus or corpus_kinds:
+        markdown = generate_corpus(kind, args.size, args.seed)
+        megabytes = len(markdown.encode()) / 1e6
+        for name, function, node_count in stages(markdown):
+            elapsed = best_time(function, args.repeat)
+            print(
+                f"{kind:<18}{name:<24}{elapsed * 1000:>9.2f} ms"
+                f"{megabytes / elapsed:>10.1f}{node_count:>10}"
+                f"{elapsed * 1e9 / max(node_count, 1):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+)
+
+from markdown_parser import text_to_textnodes, text_to_textnodes_multipass
+
+inline_samples = [
+    "plain words in a sentence",
+    "**bold words**",
+    "*italic words*",
+    "`inline code`",
+    "[a link](https://example.com/some/page)",
+    "![an image](/images/picture.png)",
+]
+link_samples = ["[link](https://example.com/{})", "see [docs](/docs/{})"]
+
+
+def inline_paragraph(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        part = rng.choice(inline_samples)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)
+
+
+def link_paragraph(rng, size):
+    parts = []
+    length = 0
+    while length < size:
+        part = rng.choice(link_samples).format(len(parts))
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)
+
+
+def best_time(function, text, repeat):
+    timer = timeit.Timer(lambda: function(text))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the single-pass and multipass inline tokenizers"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = []
+    for size in [1_000, 10_000, 100_000]:
+        cases.append((f"inline-heavy {size // 1000}KB", inline_paragraph(rng, size)))
+    for size in [1_000, 10_000, 100_000, 1_000_000]:
+        cases.append((f"link-heavy {size // 1000}KB", link_paragraph(rng, size)))
+
+    print(f"{'case':<22}{'multipass':>14}{'single pass':>14}{'speedup':>10}")
+    for name, text in cases:
+        assert text_to_textnodes(text) == text_to_textnodes_multipass(text)
+        multipass = best_time(text_to_textnodes_multipass, text, args.repeat)
+        single_pass = best_time(text_to_textnodes, text, args.repeat)
+        print(
+            f"{name:<22}{multipass * 1000:>11.3f} ms{single_pass * 1000:>11.3f} ms"
+            f"{multipass / single_pass:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
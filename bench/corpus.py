@@ -0,0 +1,143 @@
+import argparse
+import random
+
+words = (
+    "the static site generator turns markdown documents into html pages "
+    "with a template and copies every asset into the public folder"
+).split()
+inline_samples = [
+    "**bold words**",
+    "*italic words*",
+    "`inline code`",
+    "[a link](https://example.com/some/page)",
+    "![an image](/images/picture.png)",
+]
+code_lines = [
+    "def render(node):",
+    "    return node.to_html()",
+    "for page in pages:",
+    "    generate_page(page, template, dest)",
+    "value = {'key': [1, 2, 3]}",
+    "print(value)",
+]
+
+
+def sentence(rng, word_count, inline_ratio=0.1):
+    parts = []
+    for _ in range(word_count):
+        if rng.random() < inline_ratio:
+            parts.append(rng.choice(inline_samples))
+        else:
+            parts.append(rng.choice(words))
+    return " ".join(parts)
+
+
+def paragraph_block(rng):
+    return sentence(rng, rng.randint(30, 120))
+
+
+def heading_block(rng):
+    return "#" * rng.randint(1, 3) + " " + sentence(rng, rng.randint(2, 8), 0)
+
+
+def unordered_list_block(rng, item_count=None):
+    item_count = item_count or rng.randint(3, 10)
+    items = map(lambda _: "- " + sentence(rng, rng.randint(3, 12)), range(item_count))
+    return "\n".join(items)
+
+
+def ordered_list_block(rng, item_count=None):
+    item_count = item_count or rng.randint(3, 10)
+    items = map(
+        lambda n: f"{n + 1}. " + sentence(rng, rng.randint(3, 12)), range(item_count)
+    )
+    return "\n".join(items)
+
+
+def quote_block(rng):
+    lines = map(lambda _: "> " + sentence(rng, rng.randint(5, 15)), range(3))
+    return "\n".join(lines)
+
+
+def code_block(rng, line_count=None):
+    line_count = line_count or rng.randint(3, 15)
+    lines = map(lambda _: rng.choice(code_lines), range(line_count))
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def realistic(rng, size):
+    block_kinds = [
+        (paragraph_block, 10),
+        (heading_block, 3),
+        (unordered_list_block, 2),
+        (ordered_list_block, 1),
+        (quote_block, 1),
+        (code_block, 1),
+    ]
+    functions, weights = zip(*block_kinds)
+    return __join_blocks(size, lambda: rng.choices(functions, weights)[0](rng))
+
+
+def long_paragraphs(rng, size):
+    # a handful of paragraphs, each around 100KB with no blank line inside
+    return __join_blocks(size, lambda: sentence(rng, 15_000, 0.2))
+
+
+def dense_links(rng, size):
+    def links():
+        parts = map(
+            lambda n: f"[link {n}](https://example.com/{n}) ![img](/i/{n}.png)",
+            range(rng.randint(50, 200)),
+        )
+        return " ".join(parts)
+
+    return __join_blocks(size, links)
+
+
+def huge_lists(rng, size):
+    return __join_blocks(
+        size,
+        lambda: rng.choice([unordered_list_block, ordered_list_block])(rng, 5_000),
+    )
+
+
+def big_code_blocks(rng, size):
+    return __join_blocks(size, lambda: code_block(rng, 5_000))
+
+
+def __join_blocks(size, next_block):
+    blocks = []
+    length = 0
+    while length < size:
+        block = next_block()
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+corpus_kinds = {
+    "realistic": realistic,
+    "long-paragraphs": long_paragraphs,
+    "dense-links": dense_links,
+    "huge-lists": huge_lists,
+    "big-code-blocks": big_code_blocks,
+}
+
+
+def generate_corpus(kind, size, seed=0):
+    return corpus_kinds[kind](random.Random(seed), size)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write a generated markdown corpus to stdout"
+    )
+    parser.add_argument("kind", choices=corpus_kinds)
+    parser.add_argument("--size", type=int, default=1_000_000, help="bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_corpus(args.kind, args.size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+import urllib.parse
+
+# files in the built site that are not pages or assets a browser asks for
+skipped_suffixes = (".gz", ".tmp")
+skipped_names = {".livereload", "asset-manifest.json"}
+
+
+def site_paths(public_dir):
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(public_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name in skipped_names or file_name.endswith(skipped_suffixes):
+                continue
+            relative_path = os.path.relpath(
+                os.path.join(dir_path, file_name), public_dir
+            )
+            url = "/" + relative_path.replace(os.sep, "/")
+            # pages are linked by their directory, not by index.html
+            paths.append(url.removesuffix("index.html"))
+    return paths
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    # nearest rank, so every reported latency was actually observed
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoadTest:
+    def __init__(self, host, port, paths, concurrency, keep_alive, headers, seed=0):
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self.headers = headers
+        self.random = random.Random(seed)
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.bytes_received = 0
+        self.remaining = None
+
+    async def run(self, duration=None, requests=None):
+        started = time.perf_counter()
+        deadline = started + duration if duration is not None else None
+        self.remaining = requests
+        await asyncio.gather(
+            *map(lambda _: self.__client(deadline), range(self.concurrency))
+        )
+        return time.perf_counter() - started
+
+    async def __client(self, deadline):
+        connection = None
+        while self.__take_request(deadline):
+            path = self.random.choice(self.paths)
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(self.host, self.port)
+                status, body_size, reusable = await self.__request(*connection, path)
+            except (OSError, ValueError, asyncio.IncompleteReadError) as error:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+                connection = self.__close(connection)
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes_received += body_size
+            if not reusable:
+                connection = self.__close(connection)
+        self.__close(connection)
+
+    def __take_request(self, deadline):
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if self.remaining is None:
+            return True
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        return True
+
+    async def __request(self, reader, writer, path):
+        lines = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Connection: {'keep-alive' if self.keep_alive else 'close'}",
+        ]
+        lines.extend(map(lambda header: f"{header[0]}: {header[1]}", self.headers))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        head = await reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        version, status = status_line.split(" ")[:2]
+        headers = {}
+        for line in filter(None, header_lines):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            reusable = self.keep_alive and connection != "close"
+        else:
+            reusable = self.keep_alive and connection == "keep-alive"
+
+        if "content-length" in headers:
+            body_size = int(headers["content-length"])
+            await reader.readexactly(body_size)
+        else:
+            # no length, the body runs until the server closes
+            body_size = len(await reader.read())
+            reusable = False
+        return int(status), body_size, reusable
+
+    def __close(self, connection):
+        if connection is not None:
+            connection[1].close()
+        return None
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+        completed = len(latencies)
+        return {
+            "concurrency": self.concurrency,
+            "keep_alive": self.keep_alive,
+            "paths": len(self.paths),
+            "duration_s": elapsed,
+            "requests": completed,
+            "errors": sum(self.errors.values()),
+            "error_types": self.errors,
+            "statuses": dict(
+                map(lambda item: (str(item[0]), item[1]), sorted(self.statuses.items()))
+            ),
+            "requests_per_s": completed / elapsed if elapsed else 0,
+            "megabytes_per_s": self.bytes_received / 1e6 / elapsed if elapsed else 0,
+            "latency_ms": {
+                "min": latencies[0] * 1000 if latencies else 0,
+                "mean": sum(latencies) / completed * 1000 if latencies else 0,
+                "p50": percentile(latencies, 0.50) * 1000,
+                "p95": percentile(latencies, 0.95) * 1000,
+                "p99": percentile(latencies, 0.99) * 1000,
+                "max": latencies[-1] * 1000 if latencies else 0,
+            },
+        }
+
+
+def format_report(report):
+    latency = report["latency_ms"]
+    statuses = ", ".join(
+        map(lambda item: f"{item[0]}: {item[1]}", report["statuses"].items())
+    )
+    rows = [
+        ("concurrency", str(report["concurrency"])),
+        ("keep-alive", "on" if report["keep_alive"] else "off"),
+        ("paths", str(report["paths"])),
+        ("duration", f"{report['duration_s']:.2f} s"),
+        ("requests", str(report["requests"])),
+        ("errors", str(report["errors"])),
+        ("statuses", statuses or "-"),
+        ("requests/s", f"{report['requests_per_s']:.1f}"),
+        ("throughput", f"{report['megabytes_per_s']:.2f} MB/s"),
+    ]
+    for name in ("min", "mean", "p50", "p95", "p99", "max"):
+        rows.append((f"latency {name}", f"{latency[name]:.2f} ms"))
+    return "\n".join(map(lambda row: f"{row[0]:<16}{row[1]:>20}", rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test a running server.py with the pages and assets of the built site"
+    )
+    parser.add_argument("--url", default="http://localhost:8888", help="Server to test")
+    parser.add_argument(
+        "--public",
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "..", "public"
+        ),
+        help="Built site whose files make up the request mix (default: ../public)",
+    )
+    parser.add_argument(
+        "--path",
+        action="append",
+        help="Request this path instead of the site's files, can be repeated",
+    )
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--duration", type=float, default=10, help="seconds, unless --requests is set"
+    )
+    parser.add_argument("-n", "--requests", type=int, help="Total number of requests")
+    parser.add_argument(
+        "--keep-alive",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse connections between requests (default: on)",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true", help="Send Accept-Encoding: gzip"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", metavar="PATH", help="Also write the report as JSON, - for stdout"
+    )
+    args = parser.parse_args()
+
+    url = urllib.parse.urlsplit(args.url)
+    paths = args.path or site_paths(args.public)
+    if not paths:
+        parser.error(f"no files in {args.public}, build the site or pass --path")
+    headers = [("Accept-Encoding", "gzip")] if args.gzip else []
+    load_test = LoadTest(
+        url.hostname or "localhost",
+        url.port or 80,
+        paths,
+        args.concurrency,
+        args.keep_alive,
+        headers,
+        args.seed,
+    )
+    duration = None if args.requests is not None else args.duration
+    elapsed = asyncio.run(load_test.run(duration, args.requests))
+    report = load_test.report(elapsed)
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=1)
+        print()
+        return
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,1280 @@
+import io
 import os
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import asyncio
+import contextvars
+import email.utils
+import functools
+import hashlib
+import json
+import mimetypes
+import multiprocessing
+import posixpath
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import HTTPServer, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+cors_headers = [
+    ("Access-Control-Allow-Origin", "*"),
+    ("Access-Control-Allow-Methods", "GET, OPTIONS"),
+    ("Access-Control-Allow-Headers", "*"),
+]
+
+# written by `python src/main.py --fingerprint`, its values are the hashed
+# urls, which never change content so they can be cached for good
+asset_manifest_name = "asset-manifest.json"
+immutable_cache_control = "public, max-age=31536000, immutable"
+# a Range header asking for more pieces than this is ignored
+max_ranges = 16
+
+# seconds a stopping server waits for requests in flight, and the supervisor
+# for its workers
+shutdown_timeout = 10
+# a worker dying sooner than this after starting is restarted with a delay,
+# so a worker that can't start doesn't fork in a tight loop
+min_worker_uptime = 1
+worker_restart_delay = 1
+worker_stop_signals = (signal.SIGTERM, signal.SIGINT)
+
+metrics_path = "/__metrics"
+# upper bounds in seconds of the request latency histogram buckets
+latency_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+# all: every request, errors: responses with status 400 and up, none: nothing
+request_log_modes = ("all", "errors", "none")
+
+# written by `python src/main.py --watch` after every rebuild
+live_reload_stamp = ".livereload"
+live_reload_poll_interval = 0.1
+live_reload_keepalive_interval = 15
+live_reload_path = "/__livereload"
+live_reload_script = (
+    b"<script>new EventSource('" + live_reload_path.encode() + b"')"
+    b".onmessage = function () { location.reload(); };</script>"
+)
+
+
+class CachedFile:
+    __slots__ = (
+        "path",
+        "body",
+        "etag",
+        "size",
+        "mtime_ns",
+        "inode",
+        "last_modified",
+        "content_type",
+    )
+
+    def __init__(self, path, body, etag, stat):
+        self.path = path
+        self.body = body
+        self.etag = etag
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.inode = stat.st_ino
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        self.content_type = guess_type(path)
+
+
+class FileCache:
+    def __init__(self, max_size, max_file_size=None, metrics=None):
+        self.max_size = max_size
+        self.max_file_size = max_size // 8 if max_file_size is None else max_file_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.metrics = metrics
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            hit = (
+                entry is not None
+                and entry.mtime_ns == stat.st_mtime_ns
+                and entry.size == stat.st_size
+                # a published generation swap replaces changed files only,
+                # the unchanged ones are hard links and stay cached
+                and entry.inode == stat.st_ino
+            )
+            if hit:
+                self.entries.move_to_end(path)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if self.metrics is not None:
+            self.metrics.cache_lookup(hit)
+        if hit:
+            return entry
+
+        if stat.st_size > self.max_file_size:
+            # too big to keep in memory, served from disk with a stat-based tag
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            return CachedFile(path, None, etag, stat)
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            body = file.read()
+        entry = CachedFile(
+            path, body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', stat
+        )
+        with self.lock:
+            previous = self.entries.pop(path, None)
+            if previous is not None:
+                self.size -= len(previous.body)
+            self.entries[path] = entry
+            self.size += len(body)
+            while self.size > self.max_size:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return entry
+
+
+class FingerprintedAssets:
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, asset_manifest_name)
+        self.version = None
+        self.urls = frozenset()
+        self.lock = threading.Lock()
+
+    def is_fingerprinted(self, path):
+        url = "/" + os.path.relpath(path, self.directory).replace(os.sep, "/")
+        return url in self.__current_urls()
+
+    def __current_urls(self):
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return frozenset()
+        # reloaded whenever a build rewrites it or publishes a new generation
+        version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        with self.lock:
+            if version != self.version:
+                try:
+                    with open(self.manifest_path) as manifest_file:
+                        self.urls = frozenset(json.load(manifest_file).values())
+                except (OSError, ValueError, AttributeError):
+                    self.urls = frozenset()
+                self.version = version
+            return self.urls
+
+
+class ServerMetrics:
+    # slots of the shared counter array, statuses are indexed by code
+    status_slots = range(100, 600)
+    bytes_slot = len(status_slots)
+    connections_slot = bytes_slot + 1
+    cache_hits_slot = bytes_slot + 2
+    cache_misses_slot = bytes_slot + 3
+    latency_sum_slot = bytes_slot + 4
+    latency_slot = bytes_slot + 5
+
+    def __init__(self):
+        self.started = time.time()
+        # created before any prefork worker, so they all count into the same
+        # shared memory and a scrape sees every worker's requests; the last
+        # latency bucket is everything above the largest bound
+        self.counters = multiprocessing.Array(
+            "q", self.latency_slot + len(latency_buckets) + 1
+        )
+
+    def connection_opened(self):
+        self.__add(self.connections_slot, 1)
+
+    def connection_closed(self):
+        self.__add(self.connections_slot, -1)
+
+    def cache_lookup(self, hit):
+        self.__add(self.cache_hits_slot if hit else self.cache_misses_slot, 1)
+
+    def record(self, status, size, seconds):
+        bucket = len(latency_buckets)
+        for i, bound in enumerate(latency_buckets):
+            if seconds <= bound:
+                bucket = i
+                break
+        with self.counters.get_lock():
+            if status in self.status_slots:
+                self.counters[status - self.status_slots.start] += 1
+            self.counters[self.bytes_slot] += size
+            self.counters[self.latency_slot + bucket] += 1
+            self.counters[self.latency_sum_slot] += round(seconds * 1e9)
+
+    def __add(self, slot, amount):
+        with self.counters.get_lock():
+            self.counters[slot] += amount
+
+    def snapshot(self, file_cache):
+        with self.counters.get_lock():
+            counters = self.counters[:]
+        statuses = {}
+        for code in self.status_slots:
+            if counters[code - self.status_slots.start]:
+                statuses[code] = counters[code - self.status_slots.start]
+        hits = counters[self.cache_hits_slot]
+        misses = counters[self.cache_misses_slot]
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(
+            list(map(str, latency_buckets)) + ["+Inf"],
+            counters[self.latency_slot :],
+        ):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {
+            # the worker that answered, only the cache size is its own
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.started,
+            "requests": dict(
+                map(lambda item: (str(item[0]), item[1]), statuses.items())
+            ),
+            "bytes_sent": counters[self.bytes_slot],
+            "connections_in_flight": counters[self.connections_slot],
+            "file_cache": {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0,
+                "bytes": file_cache.size,
+            },
+            "latency_seconds": {
+                "buckets": buckets,
+                "sum": counters[self.latency_sum_slot] / 1e9,
+                "count": cumulative,
+            },
+        }
+
+
+class Exchange:
+    __slots__ = ("started", "request_line", "method", "status", "size")
+
+    def __init__(self, started):
+        self.started = started
+        self.request_line = "-"
+        self.method = None
+        self.status = None
+        self.size = 0
+
+
+# the request an asyncio connection task is answering
+current_exchange = contextvars.ContextVar("current_exchange")
+
+
+def metrics_response(metrics, file_cache, query):
+    snapshot = metrics.snapshot(file_cache)
+    if "json" in urllib.parse.parse_qs(query).get("format", []):
+        body = json.dumps(snapshot, indent=1).encode()
+        return body, "application/json"
+    return prometheus_text(snapshot).encode(), "text/plain; version=0.0.4"
+
+
+def prometheus_text(snapshot):
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    metric(
+        "server_requests_total",
+        "counter",
+        "Requests answered, by status code.",
+        map(
+            lambda item: (f'{{status="{item[0]}"}}', item[1]),
+            snapshot["requests"].items(),
+        ),
+    )
+    metric(
+        "server_sent_bytes_total",
+        "counter",
+        "Response body bytes sent.",
+        [("", snapshot["bytes_sent"])],
+    )
+    metric(
+        "server_connections_in_flight",
+        "gauge",
+        "Client connections currently open.",
+        [("", snapshot["connections_in_flight"])],
+    )
+    file_cache = snapshot["file_cache"]
+    metric(
+        "server_file_cache_lookups_total",
+        "counter",
+        "In-memory file cache lookups, by result.",
+        [
+            ('{result="hit"}', file_cache["hits"]),
+            ('{result="miss"}', file_cache["misses"]),
+        ],
+    )
+    metric(
+        "server_file_cache_hit_ratio",
+        "gauge",
+        "Share of file cache lookups that were hits.",
+        [("", file_cache["hit_ratio"])],
+    )
+    metric(
+        "server_file_cache_bytes",
+        "gauge",
+        "File contents held in memory by the worker process that answered.",
+        [(f'{{pid="{snapshot["pid"]}"}}', file_cache["bytes"])],
+    )
+    latency = snapshot["latency_seconds"]
+    metric(
+        "server_request_duration_seconds",
+        "histogram",
+        "Time from reading a request to sending the end of its response.",
+        [],
+    )
+    for bound, count in latency["buckets"].items():
+        lines.append(f'server_request_duration_seconds_bucket{{le="{bound}"}} {count}')
+    lines.append(f"server_request_duration_seconds_sum {latency['sum']}")
+    lines.append(f"server_request_duration_seconds_count {latency['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def should_log(request_log, status):
+    if request_log == "all":
+        return True
+    return request_log == "errors" and status != "-" and int(status) >= 400
+
+
+def log_request_line(address, request_line, status, size="-"):
+    # the format BaseHTTPRequestHandler.log_request writes
+    timestamp = time.strftime("%d/%b/%Y %H:%M:%S")
+    sys.stderr.write(f'{address} - - [{timestamp}] "{request_line}" {status} {size}\n')
 
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
+    file_cache = FileCache(0)
+    fingerprinted_assets = None
+    metrics = None
+    request_log = "all"
+
+    def handle(self):
+        if self.metrics is None:
+            return super().handle()
+        self.metrics.connection_opened()
+        try:
+            super().handle()
+        finally:
+            self.metrics.connection_closed()
+
+    def parse_request(self):
+        # timed from here, not from waiting on the request line
+        self.request_started = time.perf_counter()
+        return super().parse_request()
+
+    def handle_one_request(self):
+        self.request_started = time.perf_counter()
+        self.response_status = None
+        self.response_size = 0
+        super().handle_one_request()
+        if self.metrics is not None and self.response_status is not None:
+            self.metrics.record(
+                self.response_status,
+                self.response_size,
+                time.perf_counter() - self.request_started,
+            )
+
+    def send_response(self, code, message=None):
+        self.response_status = int(code)
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == "content-length" and self.command != "HEAD":
+            self.response_size = int(value)
+        super().send_header(keyword, value)
+
+    def log_request(self, code="-", size="-"):
+        if should_log(self.request_log, code):
+            super().log_request(code, size)
+
+    def log_error(self, format, *args):
+        if self.request_log != "none":
+            super().log_error(format, *args)
+
     def end_headers(self):
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "*")
+        for name, value in cors_headers:
+            self.send_header(name, value)
         super().end_headers()
 
     def do_OPTIONS(self):
         self.send_response(200, "OK")
         self.end_headers()
 
+    def send_head(self):
+        url = urllib.parse.urlsplit(self.path)
+        if self.metrics is not None and url.path == metrics_path:
+            return self.__send_metrics(url.query)
+        status, path = resolve_path(self.directory, url)
+        if status != HTTPStatus.OK:
+            # redirects, directory listings and 404s
+            return super().send_head()
+        try:
+            entry, content_type, extra_headers = select_representation(
+                self.file_cache,
+                path,
+                self.headers.get("Accept-Encoding"),
+                self.fingerprinted_assets,
+            )
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        if is_not_modified(
+            entry,
+            self.headers.get("If-None-Match"),
+            self.headers.get("If-Modified-Since"),
+        ):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", entry.etag)
+            for name, value in extra_headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return None
+        status, headers, pieces = range_response(
+            entry,
+            content_type,
+            self.headers.get("Range"),
+            self.headers.get("If-Range"),
+        )
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(content_length(pieces)))
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("ETag", entry.etag)
+        for name, value in extra_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        return ResponseBody(entry, pieces)
+
+    def __send_metrics(self, query):
+        body, content_type = metrics_response(self.metrics, self.file_cache, query)
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def copyfile(self, source, outputfile):
+        if isinstance(source, ResponseBody):
+            # wfile is unbuffered, so the headers are already on the socket
+            source.send(self.connection)
+        else:
+            super().copyfile(source, outputfile)
+
+
+class LiveReloadHTTPRequestHandler(CORSHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == live_reload_path:
+            self.__send_reload_events()
+        else:
+            super().do_GET()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            return super().send_head()
+
+        with open(path, "rb") as html_file:
+            body = inject_live_reload_script(html_file.read())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def __send_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        stamp_path = os.path.join(self.directory, live_reload_stamp)
+        last_stamp = read_stamp(stamp_path)
+        idle_time = 0
+        try:
+            while True:
+                time.sleep(live_reload_poll_interval)
+                stamp = read_stamp(stamp_path)
+                if stamp != last_stamp:
+                    last_stamp = stamp
+                    self.wfile.write(b"data: reload\n\n")
+                elif idle_time >= live_reload_keepalive_interval:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    idle_time += live_reload_poll_interval
+                    continue
+                self.wfile.flush()
+                idle_time = 0
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class AsyncHTTPServer:
+    keep_alive_timeout = 5
+    max_header_size = 1 << 16
+
+    def __init__(
+        self,
+        server_address,
+        directory=None,
+        live_reload=False,
+        file_cache=None,
+        sock=None,
+        stop_signals=(),
+        metrics=None,
+        request_log="all",
+    ):
+        self.server_address = server_address
+        self.directory = os.path.abspath(directory or os.getcwd())
+        self.live_reload = live_reload
+        self.file_cache = file_cache if file_cache is not None else FileCache(0)
+        self.fingerprinted_assets = FingerprintedAssets(self.directory)
+        # an already listening socket, shared by prefork workers
+        self.sock = sock
+        self.stop_signals = stop_signals
+        self.metrics = metrics
+        self.request_log = request_log
+        self.connections = set()
+        self.busy_connections = set()
+        self.closing = False
+        self.stop = None
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self.__serve())
+        except KeyboardInterrupt:
+            pass
+
+    def shutdown(self):
+        # from another thread, like socketserver's shutdown
+        self.stop()
+
+    async def __serve(self):
+        if self.sock is not None:
+            server = await asyncio.start_server(
+                self.handle_connection, sock=self.sock, limit=self.max_header_size
+            )
+        else:
+            host, port = self.server_address
+            server = await asyncio.start_server(
+                self.handle_connection, host or None, port, limit=self.max_header_size
+            )
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        for signum in self.stop_signals:
+            loop.add_signal_handler(signum, stopped.cancel)
+        self.stop = lambda: loop.call_soon_threadsafe(stopped.cancel)
+        async with server:
+            try:
+                await stopped
+            except asyncio.CancelledError:
+                pass
+            server.close()
+            await self.__close_connections()
+
+    async def __close_connections(self):
+        # idle keep-alive connections are dropped, requests in flight finish
+        self.closing = True
+        for task in self.connections - self.busy_connections:
+            task.cancel()
+        if self.connections:
+            await asyncio.wait(set(self.connections), timeout=shutdown_timeout)
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        if self.metrics is not None:
+            self.metrics.connection_opened()
+        try:
+            while not self.closing and await self.__handle_request(reader, writer):
+                pass
+        except (
+            OSError,
+            ValueError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+        ):
+            # covers disconnects, idle keep-alive timeouts and malformed requests
+            pass
+        finally:
+            self.connections.discard(task)
+            if self.metrics is not None:
+                self.metrics.connection_closed()
+            writer.close()
+
+    async def __handle_request(self, reader, writer):
+        head = await asyncio.wait_for(
+            reader.readuntil(b"\r\n\r\n"), self.keep_alive_timeout
+        )
+        task = asyncio.current_task()
+        self.busy_connections.add(task)
+        exchange = Exchange(time.perf_counter())
+        current_exchange.set(exchange)
+        try:
+            return await self.__respond(reader, writer, head)
+        finally:
+            self.busy_connections.discard(task)
+            self.__finish(writer, exchange)
+
+    def __finish(self, writer, exchange):
+        if exchange.status is None:
+            return
+        if exchange.method == "HEAD":
+            exchange.size = 0
+        if self.metrics is not None:
+            self.metrics.record(
+                exchange.status, exchange.size, time.perf_counter() - exchange.started
+            )
+        if should_log(self.request_log, exchange.status):
+            peer = writer.get_extra_info("peername")
+            log_request_line(
+                peer[0] if peer else "-", exchange.request_line, exchange.status
+            )
+
+    async def __respond(self, reader, writer, head):
+        request = parse_request_head(head)
+        if request is None:
+            await self.__send(writer, HTTPStatus.BAD_REQUEST, [], keep_alive=False)
+            return False
+        method, target, version, headers = request
+        exchange = current_exchange.get()
+        exchange.request_line = f"{method} {target} {version}"
+        exchange.method = method
+        # a server shutting down finishes this response and closes
+        keep_alive = wants_keep_alive(version, headers) and not self.closing
+        if "content-length" in headers:
+            await reader.readexactly(int(headers["content-length"]))
+
+        if method == "OPTIONS":
+            await self.__send(writer, HTTPStatus.OK, [], keep_alive=keep_alive)
+        elif method in ("GET", "HEAD"):
+            return await self.__send_path(writer, method, target, headers, keep_alive)
+        else:
+            await self.__send(
+                writer, HTTPStatus.NOT_IMPLEMENTED, [], keep_alive=keep_alive
+            )
+        return keep_alive
+
+    async def __send_path(self, writer, method, target, headers, keep_alive):
+        url = urllib.parse.urlsplit(target)
+        if self.live_reload and url.path == live_reload_path:
+            await self.__send_reload_events(writer)
+            return False
+        if self.metrics is not None and url.path == metrics_path:
+            body, content_type = metrics_response(
+                self.metrics, self.file_cache, url.query
+            )
+            await self.__send(
+                writer,
+                HTTPStatus.OK,
+                [("Content-Type", content_type), ("Cache-Control", "no-cache")],
+                body,
+                keep_alive,
+                method,
+            )
+            return keep_alive
+
+        status, path = resolve_path(self.directory, url)
+        if status == HTTPStatus.MOVED_PERMANENTLY:
+            await self.__send(
+                writer, status, [("Location", path)], keep_alive=keep_alive
+            )
+            return keep_alive
+        if status == HTTPStatus.NOT_FOUND:
+            await self.__send(writer, status, [], b"File not found", keep_alive, method)
+            return keep_alive
+
+        inject_script = self.live_reload and path.endswith(".html")
+        entry, content_type, extra_headers = select_representation(
+            self.file_cache,
+            path,
+            None if inject_script else headers.get("accept-encoding"),
+            self.fingerprinted_assets,
+        )
+        if is_not_modified(
+            entry, headers.get("if-none-match"), headers.get("if-modified-since")
+        ):
+            await self.__send_head(
+                writer,
+                HTTPStatus.NOT_MODIFIED,
+                [("ETag", entry.etag)] + extra_headers,
+                keep_alive,
+            )
+            return keep_alive
+        response_headers = [
+            ("Last-Modified", entry.last_modified),
+            ("ETag", entry.etag),
+        ] + extra_headers
+        if inject_script:
+            with open(path, "rb") as html_file:
+                body = inject_live_reload_script(html_file.read())
+            response_headers += [
+                ("Content-Type", content_type),
+                ("Cache-Control", "no-cache"),
+            ]
+            await self.__send(
+                writer, HTTPStatus.OK, response_headers, body, keep_alive, method
+            )
+            return keep_alive
+
+        status, range_headers, pieces = range_response(
+            entry, content_type, headers.get("range"), headers.get("if-range")
+        )
+        response_headers += range_headers
+        response_headers.append(("Content-Length", str(content_length(pieces))))
+        await self.__send_head(writer, status, response_headers, keep_alive)
+        if method != "GET":
+            return keep_alive
+        await self.__send_pieces(writer, entry, pieces)
+        return keep_alive
+
+    async def __send_pieces(self, writer, entry, pieces):
+        if entry.body is not None:
+            body = memoryview(entry.body)
+            for piece in pieces:
+                writer.write(piece_bytes(piece, body))
+                await writer.drain()
+            return
+        loop = asyncio.get_running_loop()
+        with open(entry.path, "rb") as file:
+            for piece in pieces:
+                if isinstance(piece, bytes):
+                    writer.write(piece)
+                    continue
+                offset, count = piece
+                # falls back to reading the file when the transport can't
+                # use os.sendfile
+                await loop.sendfile(writer.transport, file, offset, count)
+        await writer.drain()
+
+    async def __send_reload_events(self, writer):
+        await self.__send_head(
+            writer,
+            HTTPStatus.OK,
+            [("Content-Type", "text/event-stream"), ("Cache-Control", "no-cache")],
+            keep_alive=False,
+        )
+        stamp_path = os.path.join(self.directory, live_reload_stamp)
+        last_stamp = read_stamp(stamp_path)
+        idle_time = 0
+        while True:
+            await asyncio.sleep(live_reload_poll_interval)
+            stamp = read_stamp(stamp_path)
+            if stamp != last_stamp:
+                last_stamp = stamp
+                writer.write(b"data: reload\n\n")
+            elif idle_time >= live_reload_keepalive_interval:
+                writer.write(b": keepalive\n\n")
+            else:
+                idle_time += live_reload_poll_interval
+                continue
+            await writer.drain()
+            idle_time = 0
+
+    async def __send(
+        self, writer, status, headers, body=b"", keep_alive=True, method="GET"
+    ):
+        headers = headers + [("Content-Length", str(len(body)))]
+        await self.__send_head(writer, status, headers, keep_alive)
+        if method != "HEAD" and body:
+            writer.write(body)
+            await writer.drain()
+
+    async def __send_head(self, writer, status, headers, keep_alive):
+        exchange = current_exchange.get(None)
+        if exchange is not None:
+            exchange.status = status.value
+            exchange.size = int(dict(headers).get("Content-Length", 0))
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Date: {email.utils.formatdate(usegmt=True)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        for name, value in headers + cors_headers:
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+
+def select_representation(file_cache, path, accept_encoding, fingerprinted_assets=None):
+    entry = file_cache.get(path)
+    headers = []
+    if fingerprinted_assets is not None and fingerprinted_assets.is_fingerprinted(path):
+        headers.append(("Cache-Control", immutable_cache_control))
+    gzip_path = path + ".gz"
+    if not os.path.isfile(gzip_path):
+        return entry, entry.content_type, headers
+    # a precompressed sibling exists, so the response depends on Accept-Encoding
+    headers.append(("Vary", "Accept-Encoding"))
+    if not accepts_gzip(accept_encoding):
+        return entry, entry.content_type, headers
+    gzip_entry = file_cache.get(gzip_path)
+    if gzip_entry.mtime_ns < entry.mtime_ns:
+        # left over from before the file last changed
+        return entry, entry.content_type, headers
+    return gzip_entry, entry.content_type, headers + [("Content-Encoding", "gzip")]
+
+
+class ResponseBody:
+    def __init__(self, entry, pieces):
+        self.entry = entry
+        # bytes, or (offset, count) spans of the file
+        self.pieces = pieces
+
+    def send(self, sock):
+        if self.entry.body is not None:
+            body = memoryview(self.entry.body)
+            for piece in self.pieces:
+                sock.sendall(piece_bytes(piece, body))
+            return
+        with open(self.entry.path, "rb") as file:
+            for piece in self.pieces:
+                if isinstance(piece, bytes):
+                    sock.sendall(piece)
+                else:
+                    # os.sendfile where the platform has it, no user-space copy
+                    sock.sendfile(file, *piece)
+
+    def close(self):
+        pass
+
+
+def range_response(entry, content_type, range_header, if_range):
+    ranges = None
+    if range_header is not None and if_range_matches(entry, if_range):
+        ranges = parse_ranges(range_header, entry.size)
+    if ranges is None:
+        headers = [("Content-Type", content_type), ("Accept-Ranges", "bytes")]
+        return HTTPStatus.OK, headers, [(0, entry.size)]
+    if not ranges:
+        headers = [("Content-Range", f"bytes */{entry.size}")]
+        return HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, headers, []
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers = [
+            ("Content-Type", content_type),
+            ("Accept-Ranges", "bytes"),
+            ("Content-Range", f"bytes {start}-{end}/{entry.size}"),
+        ]
+        return HTTPStatus.PARTIAL_CONTENT, headers, [(start, end - start + 1)]
+
+    boundary = os.urandom(12).hex()
+    pieces = []
+    for start, end in ranges:
+        pieces.append(
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{end}/{entry.size}\r\n\r\n"
+            ).encode("latin-1")
+        )
+        pieces.append((start, end - start + 1))
+        pieces.append(b"\r\n")
+    pieces.append(f"--{boundary}--\r\n".encode("latin-1"))
+    headers = [
+        ("Content-Type", f"multipart/byteranges; boundary={boundary}"),
+        ("Accept-Ranges", "bytes"),
+    ]
+    return HTTPStatus.PARTIAL_CONTENT, headers, pieces
+
+
+def parse_ranges(range_header, size):
+    # None means the header is ignored and the whole file is sent, an empty
+    # list that none of the ranges can be satisfied
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    specs = specs.split(",")
+    if len(specs) > max_ranges:
+        return None
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+        if not dash or not (first + last).isdigit():
+            return None
+        if not first:
+            suffix_length = int(last)
+            if suffix_length > 0 and size > 0:
+                ranges.append((max(0, size - suffix_length), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            end = int(last) if last else size - 1
+            ranges.append((start, min(end, size - 1)))
+    return ranges
+
+
+def if_range_matches(entry, if_range):
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range uses the strong comparison, a weak tag never matches
+        return if_range == entry.etag
+    return if_range == entry.last_modified
+
+
+def content_length(pieces):
+    return sum(
+        map(lambda piece: len(piece) if isinstance(piece, bytes) else piece[1], pieces)
+    )
+
+
+def piece_bytes(piece, body):
+    if isinstance(piece, bytes):
+        return piece
+    offset, count = piece
+    return body[offset : offset + count]
+
+
+def accepts_gzip(accept_encoding):
+    if not accept_encoding:
+        return False
+    qualities = {}
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        name = name.strip().lower()
+        if name not in ("gzip", "*"):
+            continue
+        quality = 1
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        qualities.setdefault(name, quality)
+    # an explicit gzip entry wins over the wildcard
+    return qualities.get("gzip", qualities.get("*", 0)) > 0
+
+
+def is_not_modified(entry, if_none_match, if_modified_since):
+    # If-None-Match takes precedence, and uses the weak comparison
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = map(lambda tag: tag.strip().removeprefix("W/"), if_none_match.split(","))
+        return entry.etag in tags
+    return if_modified_since == entry.last_modified
+
+
+def parse_request_head(head):
+    try:
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        return None
+    if not version.startswith("HTTP/"):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, separator, value = line.partition(":")
+        if not separator:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+def wants_keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.1":
+        return connection != "close"
+    return connection == "keep-alive"
+
+
+def resolve_path(directory, url):
+    # same mapping as SimpleHTTPRequestHandler.translate_path, without
+    # directory listings
+    path = directory
+    for word in filter(
+        None, posixpath.normpath(urllib.parse.unquote(url.path)).split("/")
+    ):
+        if os.path.dirname(word) or word in (os.curdir, os.pardir):
+            continue
+        path = os.path.join(path, word)
+    if os.path.isdir(path):
+        if not url.path.endswith("/"):
+            location = url._replace(path=url.path + "/")
+            return HTTPStatus.MOVED_PERMANENTLY, urllib.parse.urlunsplit(location)
+        for index in ("index.html", "index.htm"):
+            if os.path.isfile(os.path.join(path, index)):
+                return HTTPStatus.OK, os.path.join(path, index)
+        return HTTPStatus.NOT_FOUND, None
+    if url.path.endswith("/") or not os.path.isfile(path):
+        return HTTPStatus.NOT_FOUND, None
+    return HTTPStatus.OK, path
+
+
+def guess_type(path):
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding == "gzip":
+        return "application/gzip"
+    return content_type or "application/octet-stream"
+
+
+def inject_live_reload_script(html):
+    body_end = html.rfind(b"</body>")
+    if body_end == -1:
+        return html + live_reload_script
+    return html[:body_end] + live_reload_script + html[body_end:]
+
+
+def read_stamp(stamp_path):
+    try:
+        return os.stat(stamp_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def prefork(workers, serve):
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    for signum in worker_stop_signals:
+        signal.signal(signum, stop)
+    children = {}
+    for _ in range(workers):
+        spawn_worker(children, serve)
+
+    while not stopping:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        started = children.pop(pid)
+        exit_code = os.waitstatus_to_exitcode(status)
+        print(f"Worker {pid} exited with status {exit_code}, restarting it")
+        if time.monotonic() - started < min_worker_uptime:
+            time.sleep(worker_restart_delay)
+        if not stopping:
+            spawn_worker(children, serve)
+
+    print(f"Stopping {len(children)} worker(s)...")
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + shutdown_timeout + 1
+    while children and time.monotonic() < deadline:
+        pid, _ = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.05)
+        else:
+            children.pop(pid, None)
+    for pid in children:
+        # still busy after the timeout
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+
+
+def spawn_worker(children, serve):
+    # anything still buffered would be written again by the child
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid != 0:
+        children[pid] = time.monotonic()
+        return
+    exit_code = 1
+    try:
+        for signum in worker_stop_signals:
+            signal.signal(signum, signal.SIG_DFL)
+        serve()
+        exit_code = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # never return into the supervisor's code
+        os._exit(exit_code)
+
+
+def serve_until_stopped(httpd, stop_signals):
+    def stop(signum, frame):
+        # shutdown waits for serve_forever to return, so it can't be called
+        # from the thread running it
+        threading.Thread(target=httpd.shutdown).start()
+
+    for signum in stop_signals:
+        signal.signal(signum, stop)
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+
+
+def listening_server(server_class, handler_class, sock):
+    httpd = server_class(sock.getsockname(), handler_class, bind_and_activate=False)
+    httpd.socket.close()
+    httpd.socket = sock
+    httpd.server_name, httpd.server_port = sock.getsockname()[:2]
+    return httpd
+
 
 def run(
     server_class=HTTPServer,
     handler_class=CORSHTTPRequestHandler,
     port=8000,
     directory=None,
+    live_reload=False,
+    use_async=False,
+    cache_size=64 << 20,
+    workers=1,
+    metrics=False,
+    request_log="all",
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
+    # not a chdir, that would resolve a symlinked directory once and keep
+    # serving the old target after `src/main.py --atomic` swaps it
+    directory = os.path.abspath(directory or os.getcwd())
+    server_metrics = ServerMetrics() if metrics else None
+    file_cache = FileCache(cache_size, metrics=server_metrics)
+    if live_reload and not use_async:
+        # event streams stay open, so every client needs its own thread
+        server_class = ThreadingHTTPServer
+        handler_class = LiveReloadHTTPRequestHandler
+    handler_class.file_cache = file_cache
+    handler_class.fingerprinted_assets = FingerprintedAssets(directory)
+    handler_class.metrics = server_metrics
+    handler_class.request_log = request_log
+    handler_factory = functools.partial(handler_class, directory=directory)
+
+    def async_server(sock=None, stop_signals=()):
+        return AsyncHTTPServer(
+            ("", port),
+            directory,
+            live_reload,
+            file_cache,
+            sock,
+            stop_signals,
+            server_metrics,
+            request_log,
+        )
+
+    if workers > 1:
+        run_prefork(
+            server_class,
+            handler_factory,
+            port,
+            directory,
+            workers,
+            async_server if use_async else None,
+        )
+        return
+    if use_async:
+        httpd = async_server()
+        print(
+            f"Serving HTTP/1.1 (asyncio) on http://localhost:{port} "
+            f"from directory '{directory}'..."
+        )
+        httpd.serve_forever()
+        return
     server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
+    httpd = server_class(server_address, handler_factory)
     print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
     httpd.serve_forever()
 
 
+def run_prefork(
+    server_class, handler_class, port, directory, workers, async_server=None
+):
+    # the supervisor owns the listening socket and every worker accepts on
+    # the inherited copy, so connections queue up even while a worker restarts
+    sock = socket.create_server(("", port), backlog=128)
+
+    def serve():
+        if async_server is not None:
+            async_server(sock, worker_stop_signals).serve_forever()
+        else:
+            serve_until_stopped(
+                listening_server(server_class, handler_class, sock),
+                worker_stop_signals,
+            )
+
+    kind = "HTTP/1.1 (asyncio)" if async_server is not None else "HTTP"
+    print(
+        f"Serving {kind} on http://localhost:{port} from directory '{directory}' "
+        f"with {workers} worker processes..."
+    )
+    prefork(workers, serve)
+    sock.close()
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="HTTP Server with CORS")
     parser.add_argument(
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--live-reload",
+        action="store_true",
+        help="Reload open pages whenever `src/main.py --watch` rebuilds the site",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Serve with an asyncio HTTP/1.1 server supporting keep-alive",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=64,
+        help="Megabytes of file contents to keep in memory, 0 disables the cache",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of pre-forked processes serving the same port, restarted if they die",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help=f"Serve request, cache and latency metrics at {metrics_path} "
+        "(Prometheus text, ?format=json for JSON)",
+    )
+    parser.add_argument(
+        "--log",
+        choices=request_log_modes,
+        default="all",
+        help="Which requests to log to stderr (default: all)",
+    )
     args = parser.parse_args()
+    if args.workers > 1 and not hasattr(os, "fork"):
+        parser.error("--workers needs a platform with os.fork")
 
-    run(port=args.port, directory=args.dir)
+    run(
+        port=args.port,
+        directory=args.dir,
+        live_reload=args.live_reload,
+        use_async=args.use_async,
+        cache_size=args.cache_size << 20,
+        workers=args.workers,
+        metrics=args.metrics,
+        request_log=args.log,
+    )
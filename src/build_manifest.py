@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+
+# bump whenever a change to the parser or renderer alters the generated html,
+# so pages recorded by an older generator are rebuilt
+generator_version = 2
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, path, pages=None, assets=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as manifest_file:
+            try:
+                data = json.load(manifest_file)
+            except json.JSONDecodeError:
+                return cls(path)
+        if data.get("version") != generator_version:
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("assets", {}))
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(
+                {
+                    "version": generator_version,
+                    "pages": self.pages,
+                    "assets": self.assets,
+                },
+                manifest_file,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+
+    def is_page_current(self, source_path, source_hash, template_hash, dest_path):
+        entry = self.pages.get(str(source_path))
+        return (
+            entry is not None
+            and entry["source"] == source_hash
+            and entry["template"] == template_hash
+            and entry["dest"] == str(dest_path)
+            and os.path.exists(dest_path)
+        )
+
+    def record_page(self, source_path, source_hash, template_hash, dest_path):
+        self.pages[str(source_path)] = {
+            "source": source_hash,
+            "template": template_hash,
+            "dest": str(dest_path),
+        }
+
+    def remove_stale_pages(self, source_paths):
+        return self.__remove_stale_outputs(self.pages, source_paths)
+
+    def is_asset_current(self, source_path, signature, dest_path):
+        entry = self.assets.get(str(source_path))
+        return (
+            entry is not None
+            and entry["signature"] == signature
+            and entry["dest"] == str(dest_path)
+            and os.path.exists(dest_path)
+            and os.path.exists(entry.get("fingerprint", dest_path))
+        )
+
+    def record_asset(self, source_path, signature, dest_path, fingerprint_path=None):
+        entry = {"signature": signature, "dest": str(dest_path)}
+        if fingerprint_path is not None:
+            entry["fingerprint"] = str(fingerprint_path)
+        self.assets[str(source_path)] = entry
+
+    def asset_fingerprint(self, source_path):
+        entry = self.assets.get(str(source_path))
+        return entry.get("fingerprint") if entry is not None else None
+
+    def asset_outputs(self):
+        outputs = set()
+        for entry in self.assets.values():
+            outputs.add(entry["dest"])
+            if "fingerprint" in entry:
+                outputs.add(entry["fingerprint"])
+        return outputs
+
+    def remove_stale_assets(self, source_paths):
+        return self.__remove_stale_outputs(self.assets, source_paths)
+
+    def __remove_stale_outputs(self, entries, source_paths):
+        current = set(map(str, source_paths))
+        current_dests = set(
+            entry["dest"] for path, entry in entries.items() if path in current
+        )
+        removed = []
+        for source_path in list(entries):
+            if source_path in current:
+                continue
+            entry = entries.pop(source_path)
+            dest_path = entry["dest"]
+            if dest_path not in current_dests and os.path.exists(dest_path):
+                os.remove(dest_path)
+                removed.append(dest_path)
+            fingerprint_path = entry.get("fingerprint")
+            if fingerprint_path is not None and os.path.exists(fingerprint_path):
+                os.remove(fingerprint_path)
+                removed.append(fingerprint_path)
+        return removed
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class BuildProfiler:
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    @contextmanager
+    def span(self, name, category="stage", **args):
+        # perf_counter_ns is system-wide, so worker process spans line up
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.__add_event(name, category, started, time.perf_counter_ns(), args)
+
+    @contextmanager
+    def page(self, name):
+        # pages are parsed and written block by block, so a span per stage
+        # call would flood the trace, stages are summed per page instead
+        started = time.perf_counter_ns()
+        totals = {}
+        running = []
+
+        @contextmanager
+        def stage(stage_name):
+            now = time.perf_counter_ns()
+            if running:
+                # time spent in a nested stage isn't counted for the outer one
+                outer_name, outer_started = running[-1]
+                totals[outer_name] = totals.get(outer_name, 0) + now - outer_started
+            running.append([stage_name, now])
+            try:
+                yield
+            finally:
+                now = time.perf_counter_ns()
+                _, stage_started = running.pop()
+                totals[stage_name] = totals.get(stage_name, 0) + now - stage_started
+                if running:
+                    running[-1][1] = now
+
+        try:
+            yield stage
+        finally:
+            self.__add_event(name, "page", started, time.perf_counter_ns(), {})
+            # laid end to end inside the page span, in the order they first ran
+            for stage_name, total in totals.items():
+                self.__add_event(
+                    stage_name, "stage", started, started + total, {"page": name}
+                )
+                started += total
+
+    def __add_event(self, name, category, started, ended, args):
+        self.events.append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": started / 1000,
+                "dur": (ended - started) / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                "args": args,
+            }
+        )
+
+    def add_events(self, events):
+        self.events.extend(events)
+
+    def write_trace(self, path):
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, trace_file)
+
+    def slowest_pages(self, limit=10):
+        pages = filter(lambda event: event["cat"] == "page", self.events)
+        return sorted(pages, key=lambda event: event["dur"], reverse=True)[:limit]
+
+    def stage_totals(self):
+        totals = {}
+        for event in self.events:
+            if event["cat"] == "stage":
+                total, count = totals.get(event["name"], (0, 0))
+                totals[event["name"]] = (total + event["dur"], count + 1)
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+    def summary(self, limit=10):
+        lines = ["Slowest pages:"]
+        for event in self.slowest_pages(limit):
+            lines.append(f"{event['dur'] / 1000:>10.2f} ms  {event['name']}")
+        lines.append("Time per stage:")
+        for name, (total, count) in self.stage_totals():
+            lines.append(f"{total / 1000:>10.2f} ms  {name} ({count}x)")
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    enabled = False
+    events = []
+
+    def span(self, name, category="stage", **args):
+        return nullcontext()
+
+    def page(self, name):
+        return nullcontext(no_stage)
+
+    def add_events(self, events):
+        pass
+
+
+def no_stage(name):
+    return __no_stage_context
+
+
+__no_stage_context = nullcontext()
+null_profiler = NullProfiler()
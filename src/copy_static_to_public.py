@@ -1,24 +1,154 @@
 import os
 import shutil
 
+from build_manifest import hash_file
+from discovery import discover_files
+from fingerprint import (
+    AssetManifest,
+    asset_manifest_name,
+    fingerprint_length,
+    fingerprint_path,
+)
+from output_file import copy_file, remove_empty_dirs
+from png_optimizer import optimizer_version
 
-def copy_static_to_public():
-    public_dir = "./public"
-    static_dir = "./static"
 
-    # clean up existing public files
-    if os.path.exists(public_dir):
-        shutil.rmtree(public_dir)
+def copy_static_to_public(
+    static_dir="./static",
+    public_dir="./public",
+    manifest=None,
+    checksum=False,
+    exclude=None,
+    index=None,
+    png_optimizer=None,
+    fingerprint=False,
+):
+    if manifest is None:
+        # clean up existing public files
+        if os.path.exists(public_dir):
+            shutil.rmtree(public_dir)
 
-    __copy_folder_content(static_dir, public_dir)
+        __copy_folder_content(static_dir, public_dir, exclude, index)
+        return None
 
+    return sync_static_to_public(
+        static_dir,
+        public_dir,
+        manifest,
+        checksum,
+        exclude,
+        index,
+        png_optimizer,
+        fingerprint,
+    )
 
-def __copy_folder_content(source_dir, target_dir):
-    os.mkdir(target_dir)
-    for entry in os.listdir(source_dir):
-        entry_path = os.path.join(source_dir, entry)
-        target_path = os.path.join(target_dir, entry)
-        if os.path.isfile(entry_path):
-            shutil.copy(entry_path, target_path)
+
+def sync_static_to_public(
+    static_dir,
+    public_dir,
+    manifest,
+    checksum=False,
+    exclude=None,
+    index=None,
+    png_optimizer=None,
+    fingerprint=False,
+):
+    source_paths = []
+    saved_bytes = 0
+    urls = {}
+    prefix_length = len(os.path.join(static_dir, ""))
+    for source_path in discover_files(static_dir, exclude=exclude, index=index):
+        source_paths.append(source_path)
+        target_path = os.path.join(public_dir, source_path[prefix_length:])
+        optimize = png_optimizer is not None and source_path.endswith(".png")
+        signature = file_signature(source_path, checksum)
+        if optimize:
+            # toggling the optimizer has to redo the copy
+            signature["optimizer"] = optimizer_version
+        if fingerprint:
+            signature["fingerprint"] = fingerprint_length
+        previous_fingerprint = manifest.asset_fingerprint(source_path)
+        if manifest.is_asset_current(source_path, signature, target_path):
+            if previous_fingerprint is not None:
+                __add_url(urls, public_dir, target_path, previous_fingerprint)
+            continue
+        print(f"Copying {source_path} to {target_path}")
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        if optimize:
+            original_size, optimized_size = png_optimizer.copy(source_path, target_path)
+            saved_bytes += original_size - optimized_size
         else:
-            __copy_folder_content(entry_path, target_path)
+            copy_file(source_path, target_path)
+        fingerprinted_path = None
+        if fingerprint:
+            fingerprinted_path = __write_fingerprinted_copy(target_path)
+        if previous_fingerprint not in (None, fingerprinted_path):
+            __remove_file(previous_fingerprint)
+        if fingerprinted_path is not None:
+            __add_url(urls, public_dir, target_path, fingerprinted_path)
+        manifest.record_asset(source_path, signature, target_path, fingerprinted_path)
+
+    if saved_bytes:
+        print(f"Optimized PNG images saved {saved_bytes} bytes")
+
+    for removed_path in manifest.remove_stale_assets(source_paths):
+        print(f"Removed stale asset {removed_path}")
+        remove_empty_dirs(os.path.dirname(removed_path), public_dir)
+
+    asset_manifest_path = os.path.join(public_dir, asset_manifest_name)
+    if not fingerprint:
+        # left by a fingerprinted build, the server would keep marking its
+        # urls immutable
+        static_paths = manifest.asset_outputs()
+        for path in (asset_manifest_path, asset_manifest_path + ".gz"):
+            if path not in static_paths:
+                __remove_file(path)
+        return None
+    assets = AssetManifest(urls)
+    os.makedirs(public_dir, exist_ok=True)
+    assets.save(asset_manifest_path)
+    return assets
+
+
+def __write_fingerprinted_copy(target_path):
+    path = fingerprint_path(target_path)
+    if path is None or os.path.exists(path):
+        # the name is the content hash, an existing file is already right
+        return path
+    try:
+        os.link(target_path, path)
+    except OSError:
+        copy_file(target_path, path)
+    return path
+
+
+def __add_url(urls, public_dir, target_path, fingerprinted_path):
+    prefix_length = len(os.path.join(public_dir, ""))
+    urls[__url(target_path[prefix_length:])] = __url(fingerprinted_path[prefix_length:])
+
+
+def __url(relative_path):
+    return "/" + relative_path.replace(os.sep, "/")
+
+
+def __remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def file_signature(path, checksum=False):
+    stat = os.stat(path)
+    if checksum:
+        return {"size": stat.st_size, "hash": hash_file(path)}
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def __copy_folder_content(source_dir, target_dir, exclude=None, index=None):
+    os.mkdir(target_dir)
+    prefix_length = len(os.path.join(source_dir, ""))
+    for source_path in discover_files(source_dir, exclude=exclude, index=index):
+        target_path = os.path.join(target_dir, source_path[prefix_length:])
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        shutil.copy(source_path, target_path)
@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import time
+from fnmatch import translate
+
+index_version = 1
+# a directory changed this recently may change again within the same mtime
+# tick, its listing isn't trusted on the next scan
+racy_window_ns = 2 * 10**9
+
+
+class DiscoveryIndex:
+    def __init__(self, path, dirs=None):
+        self.path = path
+        self.dirs = dirs if dirs is not None else {}
+        self.scanned = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as index_file:
+            try:
+                data = json.load(index_file)
+            except json.JSONDecodeError:
+                return cls(path)
+        if data.get("version") != index_version:
+            return cls(path)
+        return cls(path, data.get("dirs", {}))
+
+    def save(self):
+        index_dir = os.path.dirname(self.path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        # directories that weren't reached by any scan are dropped
+        self.dirs = self.scanned
+        self.scanned = {}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as index_file:
+            json.dump({"version": index_version, "dirs": self.dirs}, index_file)
+        os.replace(tmp_path, self.path)
+
+    def list_dir(self, dir_path, scan_started_ns):
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        entry = self.dirs.get(dir_path)
+        if entry is None or entry["mtime"] != mtime_ns:
+            file_names, dir_names = list_dir(dir_path)
+            entry = {"mtime": mtime_ns, "files": file_names, "dirs": dir_names}
+        if mtime_ns < scan_started_ns - racy_window_ns:
+            self.scanned[dir_path] = entry
+        return entry["files"], entry["dirs"]
+
+
+def list_dir(dir_path):
+    file_names = []
+    dir_names = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            # DirEntry caches the type from the directory read, no stat needed
+            if entry.is_file():
+                file_names.append(entry.name)
+            elif entry.is_dir():
+                dir_names.append(entry.name)
+    return file_names, dir_names
+
+
+def discover_files(root_dir, include=None, exclude=None, index=None):
+    files = []
+    __walk(
+        root_dir,
+        "",
+        __compile_globs(include),
+        __compile_globs(exclude),
+        index,
+        time.time_ns(),
+        files,
+    )
+    return files
+
+
+def __compile_globs(patterns):
+    if not patterns:
+        return None
+    # one regex for all the globs instead of an fnmatch call per pattern
+    return re.compile("|".join(map(translate, patterns))).match
+
+
+def __walk(dir_path, relative_dir, include, exclude, index, scan_started_ns, files):
+    if index is None:
+        file_names, dir_names = list_dir(dir_path)
+    else:
+        file_names, dir_names = index.list_dir(dir_path, scan_started_ns)
+    # sorted by name with files and directories mixed, like sorted(listdir)
+    entries = sorted(
+        [(name, False) for name in file_names] + [(name, True) for name in dir_names]
+    )
+    for name, is_dir in entries:
+        relative_path = relative_dir + name
+        if exclude is not None and exclude(relative_path):
+            continue
+        path = os.path.join(dir_path, name)
+        if is_dir:
+            __walk(
+                path,
+                relative_path + "/",
+                include,
+                exclude,
+                index,
+                scan_started_ns,
+                files,
+            )
+        elif include is None or include(relative_path):
+            files.append(path)
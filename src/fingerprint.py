@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import re
+
+from build_manifest import hash_file
+from htmlnode import ParentNode
+
+fingerprint_length = 10
+# pages are linked by their plain urls, so they keep them
+unfingerprinted_suffixes = {".html", ".htm"}
+asset_manifest_name = "asset-manifest.json"
+
+attribute_regex = re.compile(r"""(\b(?:href|src)\s*=\s*)(["'])(.*?)\2""")
+url_regex = re.compile(r"([^?#]*)(.*)", re.DOTALL)
+url_props = {"a": "href", "img": "src"}
+
+
+def fingerprint_path(path):
+    if os.path.splitext(path)[1] in unfingerprinted_suffixes:
+        return None
+    digest = hash_file(path)[:fingerprint_length]
+    dir_path, name = os.path.split(path)
+    stem, dot, suffix = name.rpartition(".")
+    if not stem:
+        # no suffix, or a dot file like .htaccess
+        return os.path.join(dir_path, f"{name}.{digest}")
+    return os.path.join(dir_path, f"{stem}.{digest}{dot}{suffix}")
+
+
+class AssetManifest:
+    def __init__(self, urls=None):
+        # plain url -> fingerprinted url, both absolute paths from the site root
+        self.urls = urls if urls is not None else {}
+        self.hash = hashlib.sha256(
+            json.dumps(self.urls, sort_keys=True).encode()
+        ).hexdigest()
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as manifest_file:
+            json.dump(self.urls, manifest_file, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def url_for(self, url):
+        if url is None:
+            return url
+        # a query or fragment is kept, only the path is looked up
+        path, rest = url_regex.match(url).groups()
+        fingerprinted = self.urls.get(path)
+        if fingerprinted is None:
+            return url
+        return fingerprinted + rest
+
+    def rewrite_html(self, html):
+        return attribute_regex.sub(
+            lambda match: match.group(1)
+            + match.group(2)
+            + self.url_for(match.group(3))
+            + match.group(2),
+            html,
+        )
+
+    def rewrite_node(self, node):
+        stack = [node]
+        while stack:
+            child = stack.pop()
+            if isinstance(child, ParentNode):
+                stack.extend(child.children)
+                continue
+            prop = url_props.get(child.tag)
+            if prop is not None and child.props and prop in child.props:
+                child.props[prop] = self.url_for(child.props[prop])
+        return node
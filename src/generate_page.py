@@ -1,8 +1,21 @@
-from htmlnode import ParentNode
-from markdown_to_html import markdown_to_html_node
+from build_manifest import hash_file
+from build_profiler import BuildProfiler, null_profiler
+from discovery import discover_files
+from htmlnode import ParentNode, StreamingParentNode
+from markdown_to_html import BlockMemo, iter_block_html_nodes
+from output_file import (
+    remove_empty_dirs,
+    remove_temp_file,
+    replace_if_changed,
+    temp_path,
+)
+from template import TemplateSet, compile_template
 
+import hashlib
 import os
-from pathlib import Path
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 
 def extract_title(page_html_node):
@@ -16,32 +29,277 @@ def extract_title(page_html_node):
     return page_html_node.children[0].children[0].value
 
 
-def generate_page(from_path, template_path, dest_path):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path) as markdown_file:
-        with open(template_path) as template_file:
-            markdown_content = markdown_file.read()
-            template_content = template_file.read()
-            root_html_node = markdown_to_html_node(markdown_content)
-            title = extract_title(root_html_node)
-            template_content = template_content.replace("{{ Title }}", title, 1)
-            template_content = template_content.replace(
-                "{{ Content }}", root_html_node.to_html(), 1
+def generate_page(from_path, template_path, dest_path, profiler=null_profiler):
+    print(__generating_page_message(from_path, template_path, dest_path))
+    return __write_page(
+        from_path, compile_template(template_path), dest_path, profiler=profiler
+    )
+
+
+def __generating_page_message(from_path, template_path, dest_path):
+    return f"Generating page from {from_path} to {dest_path} using {template_path}"
+
+
+def __write_page(
+    from_path,
+    template,
+    dest_path,
+    source_hash=None,
+    profiler=null_profiler,
+    render_cache=None,
+    block_memo=None,
+    assets=None,
+):
+    with profiler.page(str(from_path)) as stage:
+        cached = None
+        if render_cache is not None:
+            with stage("cache"):
+                if source_hash is None:
+                    source_hash = hash_file(from_path)
+                cache_key = __render_cache_key(source_hash, assets)
+                cached = render_cache.get(cache_key)
+        if cached is not None:
+            title, content_node = cached
+            return __write_dest(dest_path, template, title, content_node, stage)
+
+        with open(from_path) as markdown_file:
+            title, content_node = __parse_page(markdown_file, stage, block_memo, assets)
+            if render_cache is not None:
+                with stage("write"):
+                    content_node = render_cache.put(cache_key, title, content_node)
+            return __write_dest(dest_path, template, title, content_node, stage)
+
+
+def __render_cache_key(source_hash, assets):
+    if assets is None:
+        return source_hash
+    # bodies link the fingerprinted names of the assets current at the time
+    return hashlib.sha256((source_hash + assets.hash).encode()).hexdigest()
+
+
+def __parse_page(markdown_file, stage, block_memo=None, assets=None):
+    block_nodes = iter_block_html_nodes(
+        __read_chunks(markdown_file, stage), stage, block_memo, assets
+    )
+    # the title comes from the first block, so it is known before anything
+    # else in the file has been parsed
+    first_node = next(block_nodes, None)
+    title_nodes = [first_node] if first_node is not None else []
+    title = extract_title(ParentNode("div", title_nodes))
+    return title, StreamingParentNode("div", chain(title_nodes, block_nodes))
+
+
+def __write_dest(dest_path, template, title, content_node, stage):
+    dest_dir = os.path.dirname(dest_path)
+    os.makedirs(dest_dir, exist_ok=True)
+    # rendered next to the output and renamed over it, so a failed page
+    # never leaves a half-written file behind
+    tmp_path = temp_path(dest_path)
+    try:
+        # content streamed into the file is parsed on the way, the nested
+        # read, blocks and inline stages are not counted as writing
+        with stage("write"), open(tmp_path, "w") as tmp_file:
+            template.render(tmp_file, title, content_node)
+        with stage("compare"):
+            return replace_if_changed(tmp_path, dest_path)
+    except BaseException:
+        remove_temp_file(tmp_path)
+        raise
+
+
+def __read_chunks(file, stage, chunk_size=1 << 16):
+    while True:
+        with stage("read"):
+            chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def find_pages(content_dir_path, dest_dir_path, exclude=None, index=None):
+    sources = discover_files(content_dir_path, ["*.md"], exclude, index)
+    # discovered paths all start with the content dir, no relpath needed
+    prefix_length = len(os.path.join(content_dir_path, ""))
+    return list(
+        map(
+            lambda path: (
+                path,
+                __html_path(os.path.join(dest_dir_path, path[prefix_length:])),
+            ),
+            sources,
+        )
+    )
+
+
+def __html_path(path):
+    # the same string str(Path(path).with_suffix(".html")) gives, built
+    # without constructing a Path per page
+    return os.path.normpath(os.path.splitext(path)[0] + ".html")
+
+
+def generate_pages_recursive(
+    content_dir_path,
+    template_path,
+    dest_dir_path,
+    manifest=None,
+    jobs=1,
+    profiler=null_profiler,
+    render_cache=None,
+    block_memo=None,
+    variables=None,
+    exclude=None,
+    discovery_index=None,
+    assets=None,
+):
+    with profiler.span("find pages", "build"):
+        pages = find_pages(content_dir_path, dest_dir_path, exclude, discovery_index)
+    if manifest is not None:
+        remove_stale_pages(manifest, map(lambda page: page[0], pages), dest_dir_path)
+    templates = TemplateSet(template_path, content_dir_path, variables, assets)
+    generate_pages(pages, templates, manifest, jobs, profiler, render_cache, block_memo)
+
+
+def remove_stale_pages(manifest, source_paths, dest_dir_path):
+    for removed_path in manifest.remove_stale_pages(source_paths):
+        print(f"Removed stale page {removed_path}")
+        # an empty directory would still be served as a listing
+        remove_empty_dirs(os.path.dirname(removed_path), dest_dir_path)
+
+
+def generate_pages(
+    pages,
+    templates,
+    manifest=None,
+    jobs=1,
+    profiler=null_profiler,
+    render_cache=None,
+    block_memo=None,
+):
+    with profiler.span("compile templates", "build"):
+        # every template is compiled once and shared by all of its pages
+        page_jobs = list(
+            map(
+                lambda page: (page[0], templates.template_for(page[0]), page[1], None),
+                pages,
             )
+        )
+    if manifest is not None:
+        with profiler.span("hash sources", "build"):
+            pending_jobs = []
+            for from_path, template, html_path, _ in page_jobs:
+                source_hash = hash_file(from_path)
+                if not manifest.is_page_current(
+                    from_path, source_hash, template.hash, html_path
+                ):
+                    # passed on, so the render cache doesn't read it again
+                    pending_jobs.append((from_path, template, html_path, source_hash))
+            page_jobs = pending_jobs
+
+    failed_pages = []
+    unchanged_pages = 0
+    # bodies and templates have to link the same asset names
+    results = __run_page_jobs(
+        page_jobs, jobs, profiler.enabled, render_cache, block_memo, templates.assets
+    )
+    for page_job, (error, written, events) in zip(page_jobs, results):
+        from_path, template, html_path, source_hash = page_job
+        profiler.add_events(events)
+        print(__generating_page_message(from_path, template.path, html_path))
+        if error is not None:
+            print(f"Failed to generate page from {from_path}: {error}")
+            failed_pages.append(from_path)
+            continue
+        if not written:
+            unchanged_pages += 1
+        if manifest is not None:
+            manifest.record_page(from_path, source_hash, template.hash, html_path)
+    if unchanged_pages:
+        print(
+            f"{unchanged_pages} page(s) rendered identical output and were not rewritten"
+        )
+    if block_memo is not None and block_memo.hits + block_memo.misses:
+        print(block_memo.summary())
+    if render_cache is not None:
+        with profiler.span("prune render cache", "build"):
+            evicted = render_cache.prune()
+        if evicted:
+            print(f"Evicted {evicted} page(s) from the render cache")
+    if failed_pages:
+        raise ValueError(f"Failed to generate {len(failed_pages)} page(s)")
+
+
+def __run_page_jobs(
+    page_jobs, jobs, profile=False, render_cache=None, block_memo=None, assets=None
+):
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(page_jobs) <= 1:
+        page_job = partial(
+            __page_job,
+            profile=profile,
+            render_cache=render_cache,
+            block_memo=block_memo,
+            assets=assets,
+        )
+        for error, written, events, _ in map(page_job, page_jobs):
+            yield error, written, events
+        return
+
+    # a memo can't be shared between processes, every worker fills its own
+    # and reports how it did after each page
+    initargs = () if block_memo is None else (block_memo.max_size,)
+    page_job = partial(
+        __page_job, profile=profile, render_cache=render_cache, assets=assets
+    )
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(page_jobs)),
+        initializer=__init_worker,
+        initargs=initargs,
+    ) as executor:
+        # executor.map yields results in submission order, which keeps the log
+        # output deterministic no matter which worker finishes first
+        results = executor.map(
+            page_job, page_jobs, chunksize=__chunksize(page_jobs, jobs)
+        )
+        for error, written, events, memo_stats in results:
+            if block_memo is not None:
+                block_memo.add_stats(*memo_stats)
+            yield error, written, events
+
+
+__worker_block_memo = None
+
+
+def __init_worker(block_memo_size=None):
+    global __worker_block_memo
+    if block_memo_size is not None:
+        __worker_block_memo = BlockMemo(block_memo_size)
+
+
+def __chunksize(page_jobs, jobs):
+    return max(1, len(page_jobs) // (jobs * 4))
+
+
+def __page_job(
+    page_job, profile=False, render_cache=None, block_memo=None, assets=None
+):
+    # workers can't share the parent's profiler, so they send their spans back
+    profiler = BuildProfiler() if profile else null_profiler
+    if block_memo is None:
+        block_memo = __worker_block_memo
+    hits, misses = __memo_stats(block_memo)
+    error = None
+    written = False
+    try:
+        written = __write_page(*page_job, profiler, render_cache, block_memo, assets)
+    except Exception as page_error:
+        error = page_error
+    hits_after, misses_after = __memo_stats(block_memo)
+    memo_stats = (hits_after - hits, misses_after - misses)
+    return error, written, profiler.events, memo_stats
+
 
-            dest_dir = os.path.dirname(dest_path)
-            os.makedirs(dest_dir, exist_ok=True)
-            with open(dest_path, "w") as dest_file:
-                dest_file.write(template_content)
-
-
-def generate_pages_recursive(content_dir_path, template_path, dest_dir_path):
-    for entry in os.listdir(content_dir_path):
-        entry_path = os.path.join(content_dir_path, entry)
-        dest_path = os.path.join(dest_dir_path, entry)
-        if os.path.isfile(entry_path):
-            if Path(entry_path).suffix == ".md":
-                html_path = Path(dest_path).with_suffix(".html")
-                generate_page(entry_path, template_path, html_path)
-        else:
-            generate_pages_recursive(entry_path, template_path, dest_path)
+def __memo_stats(block_memo):
+    if block_memo is None:
+        return 0, 0
+    return block_memo.hits, block_memo.misses
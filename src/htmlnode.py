@@ -9,6 +9,8 @@ from textnode import (
 
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -18,6 +20,12 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError()
 
+    def iter_html(self):
+        raise NotImplementedError()
+
+    def write_to(self, file):
+        file.writelines(self.iter_html())
+
     def props_to_html(self):
         if not self.props:
             return ""
@@ -44,6 +52,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -60,43 +70,91 @@ class LeafNode(HTMLNode):
             html += self.close_tag_to_html()
         return html
 
+    def iter_html(self):
+        yield self.to_html()
+
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # walks the tree with an explicit stack rather than recursion, so
+        # arbitrarily deep documents are streamed without hitting the
+        # recursion limit or building nested intermediate strings
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                node.__validate()
+                stack.append(node.close_tag_to_html())
+                stack.extend(reversed(node.children))
+                yield node.open_tag_to_html()
+            else:
+                yield from node.iter_html()
+
+    def __validate(self):
         if not self.tag:
             raise ValueError("Invalid HTML: no tag")
         if not self.children:
             raise ValueError("ParentNode must have children")
 
-        children_html = list(map(lambda child: child.to_html(), self.children))
-        return (
-            self.open_tag_to_html() + "".join(children_html) + self.close_tag_to_html()
-        )
-
     def __repr__(self):
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
 
 
+class StreamingParentNode(HTMLNode):
+    __slots__ = ()
+
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    # children is an iterator that is consumed while rendering, so each child
+    # can be dropped as soon as it is written
+    def iter_html(self):
+        if not self.tag:
+            raise ValueError("Invalid HTML: no tag")
+        yield self.open_tag_to_html()
+        for child in self.children:
+            yield from child.iter_html()
+        yield self.close_tag_to_html()
+
+
 def text_node_to_html_node(text_node):
-    if text_node.text_type == text_type_text:
-        return LeafNode(None, text_node.text)
-    elif text_node.text_type == text_type_bold:
-        return LeafNode("b", text_node.text)
-    elif text_node.text_type == text_type_italic:
-        return LeafNode("i", text_node.text)
-    elif text_node.text_type == text_type_code:
-        # leading newline renders in html <pre><code> block so it should be removed
-        stripped_text = text_node.text.lstrip("\n")
-        return LeafNode("code", stripped_text)
-    elif text_node.text_type == text_type_link:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
-    elif text_node.text_type == text_type_image:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-    else:
+    to_html_node = __text_node_converters.get(text_node.text_type)
+    if to_html_node is None:
         raise ValueError(f"Unknown text node type: {text_node.text_type}")
+    return to_html_node(text_node)
+
+
+def __code_text_node_to_html_node(text_node):
+    # leading newline renders in html <pre><code> block so it should be removed
+    stripped_text = text_node.text.lstrip("\n")
+    return LeafNode("code", stripped_text)
+
+
+__text_node_converters = {
+    text_type_text: lambda text_node: LeafNode(None, text_node.text),
+    text_type_bold: lambda text_node: LeafNode("b", text_node.text),
+    text_type_italic: lambda text_node: LeafNode("i", text_node.text),
+    text_type_code: __code_text_node_to_html_node,
+    text_type_link: lambda text_node: LeafNode(
+        "a", text_node.text, {"href": text_node.url}
+    ),
+    text_type_image: lambda text_node: LeafNode(
+        "img", "", {"src": text_node.url, "alt": text_node.text}
+    ),
+}
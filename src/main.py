@@ -1,10 +1,327 @@
+import argparse
+import os
+import shutil
+import time
+
+from build_manifest import BuildManifest
+from build_profiler import BuildProfiler, null_profiler
 from copy_static_to_public import copy_static_to_public
-from generate_page import generate_pages_recursive
+from discovery import DiscoveryIndex
+from generate_page import (
+    find_pages,
+    generate_pages,
+    generate_pages_recursive,
+    remove_stale_pages,
+)
+from markdown_to_html import BlockMemo
+from png_optimizer import PngOptimizer
+from precompress import precompress_dir
+from publish import (
+    publish_generation,
+    staging_dir,
+    start_generation,
+    unlink_published,
+)
+from render_cache import RenderCache
+from template import TemplateSet, page_variables
+from watch import classify_changes, watch, write_live_reload_stamp
+
+manifest_path = "./.cache/build_manifest.json"
+trace_path = "./.cache/build_trace.json"
+render_cache_dir = "./.cache/render"
+discovery_index_path = "./.cache/discovery.json"
+png_cache_dir = "./.cache/png"
+generations_dir = "./.generations"
+content_dir = "./content"
+static_dir = "./static"
+template_path = "./template.html"
+partials_dir = "./partials"
+public_dir = "./public"
 
 
 def main():
-    copy_static_to_public()
-    generate_pages_recursive("./content", "./template.html", "./public")
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes generating pages in parallel, 0 uses every core",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Delete ./public and rebuild everything from scratch",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="Compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild whatever changes in content, static or the template",
+    )
+    parser.add_argument(
+        "--gzip",
+        type=int,
+        choices=range(1, 10),
+        nargs="?",
+        const=9,
+        metavar="LEVEL",
+        help="Write .gz siblings of compressible outputs (level 1-9, default 9)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=trace_path,
+        metavar="TRACE",
+        help=f"Time every page and build stage, write a Chrome trace (default {trace_path}) and print the slowest ones",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=256,
+        metavar="MB",
+        help="Size limit of the rendered page cache in .cache/render, 0 disables it",
+    )
+    parser.add_argument(
+        "--block-memo-size",
+        type=int,
+        default=64,
+        metavar="MB",
+        help="Size limit of the in-memory memo of rendered blocks shared by all pages, 0 disables it",
+    )
+    parser.add_argument(
+        "--var",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Site variable available to templates as {{ NAME }}, can be repeated",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip content and static paths matching GLOB (relative to their directory), can be repeated",
+    )
+    parser.add_argument(
+        "--optimize-png",
+        action="store_true",
+        help="Losslessly recompress static PNG images, results are cached in .cache/png",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Also copy static files to content-hashed names and link those from pages",
+    )
+    parser.add_argument(
+        "--atomic",
+        action="store_true",
+        help=f"Build into a staging copy in {generations_dir} and swap ./public, a symlink, to it once done",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=3,
+        metavar="N",
+        help="Number of published generations --atomic keeps, including the current one",
+    )
+    args = parser.parse_args()
+    if args.keep_generations < 1:
+        parser.error("--keep-generations must be at least 1")
+    try:
+        args.variables = dict(map(__parse_variable, args.var))
+    except ValueError as error:
+        parser.error(str(error))
+
+    profiler = BuildProfiler() if args.profile else null_profiler
+    block_memo = __block_memo(args)
+    if not args.atomic and unlink_published(public_dir):
+        print(f"Unlinked {public_dir} from its generation, building into a directory")
+    if args.clean:
+        manifest = BuildManifest(manifest_path)
+        discovery_index = DiscoveryIndex(discovery_index_path)
+        # the published site stays up until the swap with --atomic
+        if not args.atomic and os.path.exists(public_dir):
+            shutil.rmtree(public_dir)
+    else:
+        manifest = BuildManifest.load(manifest_path)
+        discovery_index = DiscoveryIndex.load(discovery_index_path)
+    output_dir = __output_dir(args)
+    assets = None
+    try:
+        with profiler.span("build", "build"):
+            if args.atomic:
+                with profiler.span("start generation", "build"):
+                    start_generation(public_dir, generations_dir, args.clean)
+            with profiler.span("copy static", "build"):
+                assets = copy_static_to_public(
+                    static_dir,
+                    output_dir,
+                    manifest,
+                    args.checksum,
+                    args.exclude,
+                    discovery_index,
+                    __png_optimizer(args),
+                    args.fingerprint,
+                )
+            try:
+                generate_pages_recursive(
+                    content_dir,
+                    template_path,
+                    output_dir,
+                    manifest,
+                    jobs=args.jobs,
+                    profiler=profiler,
+                    render_cache=__render_cache(args),
+                    block_memo=block_memo,
+                    variables=args.variables,
+                    exclude=args.exclude,
+                    discovery_index=discovery_index,
+                    assets=assets,
+                )
+            finally:
+                manifest.save()
+                discovery_index.save()
+            if args.gzip is not None:
+                with profiler.span("precompress", "build"):
+                    __precompress(args.gzip, output_dir, manifest)
+            if args.atomic:
+                with profiler.span("publish", "build"):
+                    __publish(args)
+    except Exception as error:
+        if not args.watch:
+            raise
+        # watching is how a broken page gets fixed, so a failed first build
+        # is reported like a failed rebuild
+        print(f"Build failed: {error}")
+    finally:
+        if args.profile:
+            profiler.write_trace(args.profile)
+            print(profiler.summary())
+            print(f"Wrote build trace to {args.profile}")
+
+    if args.watch:
+        __watch(manifest, args, block_memo, assets)
+
+
+def __watch(manifest, args, block_memo, assets):
+    def rebuild(changed, files):
+        nonlocal assets
+        started = time.perf_counter()
+        try:
+            if args.atomic:
+                start_generation(public_dir, generations_dir)
+            assets = __rebuild_changed(
+                changed, files, manifest, args, block_memo, assets
+            )
+            if args.gzip is not None:
+                __precompress(args.gzip, __output_dir(args), manifest)
+            if args.atomic:
+                __publish(args)
+        except Exception as error:
+            print(f"Build failed: {error}")
+        finally:
+            manifest.save()
+        write_live_reload_stamp(public_dir)
+        print(f"Rebuilt in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(
+        f"Watching {content_dir}, {static_dir}, {template_path} and {partials_dir} for changes..."
+    )
+    try:
+        watch([content_dir, static_dir, template_path, partials_dir], rebuild)
+    except KeyboardInterrupt:
+        pass
+
+
+def __render_cache(args):
+    if args.render_cache_size <= 0:
+        return None
+    return RenderCache(render_cache_dir, args.render_cache_size << 20)
+
+
+def __png_optimizer(args):
+    if not args.optimize_png:
+        return None
+    return PngOptimizer(png_cache_dir)
+
+
+def __parse_variable(assignment):
+    name, separator, value = assignment.partition("=")
+    if not separator or not name:
+        raise ValueError(f"--var expects NAME=VALUE, got {assignment}")
+    if name in page_variables:
+        raise ValueError(f"--var {name} is set by every page and can't be overridden")
+    return name, value
+
+
+def __block_memo(args):
+    if args.block_memo_size <= 0:
+        return None
+    return BlockMemo(args.block_memo_size << 20)
+
+
+def __output_dir(args):
+    if args.atomic:
+        # always the same path, so the manifest's outputs stay valid from one
+        # generation to the next
+        return staging_dir(generations_dir)
+    return public_dir
+
+
+def __publish(args):
+    generation_path, removed = publish_generation(
+        public_dir, generations_dir, args.keep_generations
+    )
+    print(f"Published {generation_path} as {public_dir}")
+    if removed:
+        print(f"Removed {len(removed)} old generation(s)")
+
+
+def __precompress(level, dir_path, manifest):
+    compressed = precompress_dir(dir_path, level, manifest.asset_outputs())
+    if compressed:
+        print(f"Compressed {compressed} file(s) with gzip level {level}")
+
+
+def __rebuild_changed(changed, files, manifest, args, block_memo, assets):
+    output_dir = __output_dir(args)
+    static_changed, template_changed, changed_content = classify_changes(
+        changed, content_dir, static_dir, template_path, partials_dir, args.fingerprint
+    )
+    if static_changed:
+        assets = copy_static_to_public(
+            static_dir,
+            output_dir,
+            manifest,
+            args.checksum,
+            args.exclude,
+            png_optimizer=__png_optimizer(args),
+            fingerprint=args.fingerprint,
+        )
+
+    if not template_changed and not changed_content:
+        return assets
+
+    pages = find_pages(content_dir, output_dir, args.exclude)
+    remove_stale_pages(manifest, map(lambda page: page[0], pages), output_dir)
+    if not template_changed:
+        # only the edited pages depend on the changed files
+        pages = list(filter(lambda page: page[0] in changed, pages))
+    # pages whose template didn't change are skipped by the manifest
+    generate_pages(
+        pages,
+        TemplateSet(template_path, content_dir, args.variables, assets),
+        manifest,
+        jobs=args.jobs,
+        render_cache=__render_cache(args),
+        block_memo=block_memo,
+    )
+    return assets
 
 
 if __name__ == "__main__":
@@ -22,6 +22,35 @@ def text_to_blocks(text):
     return filtered_blocks
 
 
+def iter_blocks(chunks):
+    # yields the same blocks as text_to_blocks("".join(chunks)) while holding
+    # at most one block in memory, chunks can be lines or fixed size reads
+    parts = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if parts and parts[-1].endswith("\n") and chunk.startswith("\n"):
+            # a blank line separator split across two chunks
+            yield from __finish_block("".join(parts)[:-1])
+            parts = []
+            chunk = chunk[1:]
+        pieces = chunk.split("\n\n")
+        if len(pieces) > 1:
+            parts.append(pieces[0])
+            yield from __finish_block("".join(parts))
+            for piece in pieces[1:-1]:
+                yield from __finish_block(piece)
+            parts = []
+        if pieces[-1]:
+            parts.append(pieces[-1])
+    yield from __finish_block("".join(parts))
+
+
+def __finish_block(block):
+    if block != "":
+        yield block.strip()
+
+
 def block_to_block_type(block):
     if block.startswith("# "):
         return block_type_heading_1
@@ -9,6 +9,10 @@ from textnode import (
 )
 import re
 
+__inline_delimiter_regex = re.compile(r"(\*\*|[*`])")
+__image_regex = re.compile(r"!\[(.*?)\]\((.*?)\)")
+__link_regex = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+
 
 def __split_or_default(old_nodes, split_node):
     new_nodes = []
@@ -28,9 +32,7 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
         if len(split) == 1:
             nodes.append(node)
         elif len(split) % 2 == 0:
-            raise ValueError(
-                f"Invalid markdown, needs matching {delimiter} {text_type} delimiters"
-            )
+            raise ValueError(__unmatched_delimiter_message(delimiter, text_type))
         else:
             is_inline = False
             for split_text in split:
@@ -45,16 +47,16 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return __split_or_default(old_nodes, split_delimiter)
 
 
+def __unmatched_delimiter_message(delimiter, text_type):
+    return f"Invalid markdown, needs matching {delimiter} {text_type} delimiters"
+
+
 def extract_markdown_images(text):
-    regex = r"!\[(.*?)\]\((.*?)\)"
-    images = re.findall(regex, text)
-    return images
+    return __image_regex.findall(text)
 
 
 def extract_markdown_links(text):
-    regex = r"(?<!!)\[(.*?)\]\((.*?)\)"
-    links = re.findall(regex, text)
-    return links
+    return __link_regex.findall(text)
 
 
 def split_url_nodes(node, type, extract, generate_split_token):
@@ -101,6 +103,89 @@ def split_nodes_link(old_nodes):
 
 
 def text_to_textnodes(text):
+    # Single left-to-right scan producing the same nodes as
+    # text_to_textnodes_multipass: "**", "`" and "*" toggle bold, code and
+    # italic (innermost wins), and images then links are cut out of each
+    # resulting segment. Like the multipass version, a code span only has to
+    # be closed before the next "**" and an italic span before the next "**"
+    # or "`", and unmatched delimiters are reported in bold, code, italic order.
+    if not text:
+        return [TextNode(text, text_type_text)]
+    nodes = []
+    bold = code = italic = False
+    code_unmatched = italic_unmatched = False
+    text_type = text_type_text
+    # re.split with a capturing group alternates segments and delimiters
+    parts = __inline_delimiter_regex.split(text)
+    if parts[0]:
+        __append_url_nodes(nodes, parts[0], text_type)
+    for i in range(1, len(parts), 2):
+        delimiter = parts[i]
+        if delimiter == "*":
+            italic = not italic
+        else:
+            italic_unmatched = italic_unmatched or italic
+            italic = False
+            if delimiter == "`":
+                code = not code
+            else:
+                code_unmatched = code_unmatched or code
+                code = False
+                bold = not bold
+        text_type = __text_type(bold, code, italic)
+        if parts[i + 1]:
+            __append_url_nodes(nodes, parts[i + 1], text_type)
+
+    if bold:
+        raise ValueError(__unmatched_delimiter_message("**", text_type_bold))
+    if code or code_unmatched:
+        raise ValueError(__unmatched_delimiter_message("`", text_type_code))
+    if italic or italic_unmatched:
+        raise ValueError(__unmatched_delimiter_message("*", text_type_italic))
+    return nodes
+
+
+def __text_type(bold, code, italic):
+    if italic:
+        return text_type_italic
+    elif code:
+        return text_type_code
+    elif bold:
+        return text_type_bold
+    return text_type_text
+
+
+def __append_url_nodes(nodes, text, text_type):
+    if "[" not in text:
+        nodes.append(TextNode(text, text_type))
+        return
+    if "![" not in text:
+        __append_link_nodes(nodes, text, text_type)
+        return
+    parts = __image_regex.split(text)
+    __append_link_nodes(nodes, parts[0], text_type)
+    for i in range(1, len(parts), 3):
+        nodes.append(TextNode(parts[i], text_type_image, parts[i + 1]))
+        __append_link_nodes(nodes, parts[i + 2], text_type)
+
+
+def __append_link_nodes(nodes, text, text_type):
+    if "[" not in text:
+        if text:
+            nodes.append(TextNode(text, text_type))
+        return
+    parts = __link_regex.split(text)
+    if parts[0]:
+        nodes.append(TextNode(parts[0], text_type))
+    for i in range(1, len(parts), 3):
+        nodes.append(TextNode(parts[i], text_type_link, parts[i + 1]))
+        if parts[i + 2]:
+            nodes.append(TextNode(parts[i + 2], text_type))
+
+
+# reference implementation: one full pass per inline syntax, kept for
+# differential testing and benchmarking of text_to_textnodes
+def text_to_textnodes_multipass(text):
     nodes = [TextNode(text, text_type_text)]
     nodes = split_nodes_delimiter(nodes, "**", text_type_bold)
     nodes = split_nodes_delimiter(nodes, "`", text_type_code)
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 from markdown_block_parser import (
     block_type_paragraph,
     block_type_heading_1,
@@ -10,20 +12,91 @@ from markdown_block_parser import (
     block_type_unordered_list,
     block_type_ordered_list,
     block_type_quote,
-    text_to_blocks,
+    iter_blocks,
     block_to_block_type,
 )
 from markdown_parser import text_to_textnodes
+from build_profiler import no_stage
 from htmlnode import LeafNode, ParentNode, text_node_to_html_node
 
 
-def markdown_to_html_node(markdown):
-    blocks = text_to_blocks(markdown)
-    block_htmls = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        block_htmls.append(block_to_html_node(block, block_type))
-    return ParentNode("div", block_htmls)
+def markdown_to_html_node(markdown, block_memo=None, assets=None):
+    return ParentNode(
+        "div",
+        list(iter_block_html_nodes([markdown], block_memo=block_memo, assets=assets)),
+    )
+
+
+def iter_block_html_nodes(chunks, stage=no_stage, block_memo=None, assets=None):
+    blocks = iter_blocks(chunks)
+    while True:
+        with stage("blocks"):
+            block = next(blocks, None)
+            if block is None:
+                return
+            block_type = block_to_block_type(block)
+        with stage("inline"):
+            # h1 blocks keep their node tree, extract_title reads the title from it
+            if block_memo is None or block_type == block_type_heading_1:
+                block_html = render_block(block, block_type, assets)
+            else:
+                block_html = block_memo.render(block, block_type, assets)
+        yield block_html
+
+
+def render_block(block, block_type, assets=None):
+    node = block_to_html_node(block, block_type)
+    if assets is not None:
+        assets.rewrite_node(node)
+    return node
+
+
+class BlockMemo:
+    def __init__(self, max_size=64 << 20, max_entry_size=None):
+        self.max_size = max_size
+        self.max_entry_size = (
+            max_size // 8 if max_entry_size is None else max_entry_size
+        )
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+
+    def render(self, block, block_type, assets=None):
+        # the same block renders different urls once an asset changes
+        key = (block, block_type, assets.hash if assets is not None else None)
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return LeafNode(None, html)
+        self.misses += 1
+
+        node = render_block(block, block_type, assets)
+        if len(block) > self.max_entry_size:
+            # rendered once and streamed, a big block isn't worth the memory
+            return node
+        html = node.to_html()
+        self.entries[key] = html
+        self.size += len(block) + len(html)
+        while self.size > self.max_size:
+            (old_block, _, _), old_html = self.entries.popitem(last=False)
+            self.size -= len(old_block) + len(old_html)
+        return LeafNode(None, html)
+
+    def add_stats(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def summary(self):
+        return (
+            f"Block memo: {self.hits} hits, {self.misses} misses "
+            f"({self.hit_rate():.0%} hit rate)"
+        )
 
 
 def block_to_html_node(block, block_type):
@@ -0,0 +1,57 @@
+import os
+import shutil
+
+
+def temp_path(dest_path):
+    # unique per process, parallel workers may write the same output
+    return f"{dest_path}.{os.getpid()}.tmp"
+
+
+def replace_if_changed(tmp_path, dest_path):
+    if same_content(tmp_path, dest_path):
+        # keeps the old file, its mtime and inode for rsync and caches
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dest_path)
+    return True
+
+
+def same_content(path, other_path, chunk_size=1 << 16):
+    try:
+        other_size = os.stat(other_path).st_size
+    except FileNotFoundError:
+        return False
+    if os.stat(path).st_size != other_size:
+        return False
+    with open(path, "rb") as file, open(other_path, "rb") as other_file:
+        while True:
+            chunk = file.read(chunk_size)
+            if chunk != other_file.read(chunk_size):
+                return False
+            if not chunk:
+                return True
+
+
+def copy_file(source_path, dest_path):
+    tmp_path = temp_path(dest_path)
+    try:
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        remove_temp_file(tmp_path)
+        raise
+
+
+def remove_empty_dirs(dir_path, root_dir):
+    root_dir = os.path.abspath(root_dir)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root_dir and dir_path.startswith(root_dir + os.sep):
+        if os.listdir(dir_path):
+            return
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+
+def remove_temp_file(tmp_path):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
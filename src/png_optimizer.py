@@ -0,0 +1,173 @@
+import hashlib
+import os
+import struct
+import zlib
+
+from output_file import remove_temp_file, temp_path
+
+# bump when optimize_png output changes so cached results are redone
+optimizer_version = 1
+png_signature = b"\x89PNG\r\n\x1a\n"
+# ancillary chunks that change how the image looks, everything else
+# ancillary (text, time, exif, physical size...) is metadata and dropped
+kept_ancillary_chunks = {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT"}
+
+__channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+__adam7_passes = [
+    (0, 0, 8, 8),
+    (4, 0, 8, 8),
+    (0, 4, 4, 8),
+    (2, 0, 4, 4),
+    (0, 2, 2, 4),
+    (1, 0, 2, 2),
+    (0, 1, 1, 2),
+]
+
+
+def optimize_png(data):
+    chunks = parse_chunks(data)
+    if chunks is None or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        return data
+    chunk_types = set(map(lambda chunk: chunk[0], chunks))
+    if b"acTL" in chunk_types:
+        # animated, the frames live in fdAT chunks this doesn't rewrite
+        return data
+
+    raw_size = __raw_size(chunks[0][1])
+    compressed = b"".join(map(lambda chunk: chunk[1], __chunks_of(chunks, b"IDAT")))
+    if raw_size is None or not compressed:
+        return data
+    # bounded, so a corrupt or hostile stream can't inflate without limit
+    decompressor = zlib.decompressobj()
+    try:
+        raw = decompressor.decompress(compressed, raw_size + 1)
+    except zlib.error:
+        return data
+    if len(raw) != raw_size:
+        return data
+    idat = __deflate(raw)
+
+    output = [png_signature]
+    for chunk_type, chunk_data in chunks:
+        if chunk_type == b"IDAT":
+            if idat is not None:
+                output.append(__chunk(b"IDAT", idat))
+                idat = None
+        elif not __is_ancillary(chunk_type) or chunk_type in kept_ancillary_chunks:
+            output.append(__chunk(chunk_type, chunk_data))
+    optimized = b"".join(output)
+    return optimized if len(optimized) < len(data) else data
+
+
+def parse_chunks(data):
+    if not data.startswith(png_signature):
+        return None
+    chunks = []
+    offset = len(png_signature)
+    while offset < len(data):
+        if offset + 12 > len(data):
+            return None
+        length, chunk_type = struct.unpack(">I4s", data[offset : offset + 8])
+        chunk_data = data[offset + 8 : offset + 8 + length]
+        crc_offset = offset + 8 + length
+        if len(chunk_data) != length or crc_offset + 4 > len(data):
+            return None
+        (crc,) = struct.unpack(">I", data[crc_offset : crc_offset + 4])
+        if zlib.crc32(chunk_type + chunk_data) != crc:
+            return None
+        chunks.append((chunk_type, chunk_data))
+        offset = crc_offset + 4
+        if chunk_type == b"IEND":
+            break
+    return chunks
+
+
+def __chunks_of(chunks, chunk_type):
+    return filter(lambda chunk: chunk[0] == chunk_type, chunks)
+
+
+def __is_ancillary(chunk_type):
+    # the case of the first letter marks a chunk as critical or ancillary
+    return bool(chunk_type[0] & 0x20)
+
+
+def __chunk(chunk_type, chunk_data):
+    crc = zlib.crc32(chunk_type + chunk_data)
+    return (
+        struct.pack(">I", len(chunk_data))
+        + chunk_type
+        + chunk_data
+        + struct.pack(">I", crc)
+    )
+
+
+def __raw_size(ihdr):
+    if len(ihdr) != 13:
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(
+        ">IIBBBBB", ihdr
+    )
+    channels = __channels.get(color_type)
+    if channels is None:
+        return None
+    bits_per_pixel = channels * bit_depth
+    if not interlace:
+        return height * ((width * bits_per_pixel + 7) // 8 + 1)
+    raw_size = 0
+    for x, y, dx, dy in __adam7_passes:
+        pass_width = (width - x + dx - 1) // dx
+        pass_height = (height - y + dy - 1) // dy
+        if pass_width and pass_height:
+            raw_size += pass_height * ((pass_width * bits_per_pixel + 7) // 8 + 1)
+    return raw_size
+
+
+def __deflate(raw):
+    results = []
+    for strategy in [zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED]:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        results.append(compressor.compress(raw) + compressor.flush())
+    return min(results, key=len)
+
+
+class PngOptimizer:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def copy(self, source_path, dest_path):
+        with open(source_path, "rb") as source_file:
+            data = source_file.read()
+        optimized = self.optimize(data)
+        tmp_path = temp_path(dest_path)
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                tmp_file.write(optimized)
+            stat = os.stat(source_path)
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            remove_temp_file(tmp_path)
+            raise
+        return len(data), len(optimized)
+
+    def optimize(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        cache_path = os.path.join(
+            self.cache_dir, str(optimizer_version), digest[:2], digest + ".png"
+        )
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return cache_file.read()
+        except FileNotFoundError:
+            pass
+        optimized = optimize_png(data)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = temp_path(cache_path)
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                tmp_file.write(optimized)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            remove_temp_file(tmp_path)
+            raise
+        return optimized
@@ -0,0 +1,75 @@
+import gzip
+import os
+from pathlib import Path
+
+from output_file import remove_empty_dirs, remove_temp_file, temp_path
+
+compressible_suffixes = {
+    ".html",
+    ".css",
+    ".js",
+    ".json",
+    ".svg",
+    ".txt",
+    ".xml",
+    ".map",
+}
+
+
+def precompress_dir(dir_path, level=9, static_paths=()):
+    # copied from static rather than written here, a .gz among them is kept
+    # as it is
+    static_paths = set(map(os.path.normpath, static_paths))
+    compressed = 0
+    for current_dir, _, file_names in os.walk(dir_path):
+        for file_name in file_names:
+            path = os.path.join(current_dir, file_name)
+            source_path = path.removesuffix(".gz")
+            if source_path != path:
+                if (
+                    __is_compressible(source_path)
+                    and not os.path.exists(source_path)
+                    and os.path.normpath(path) not in static_paths
+                ):
+                    # written for a page or asset that no longer exists
+                    os.remove(path)
+                    remove_empty_dirs(current_dir, dir_path)
+            elif __is_compressible(path) and (
+                os.path.normpath(path + ".gz") not in static_paths
+            ):
+                if precompress_file(path, level):
+                    compressed += 1
+    return compressed
+
+
+def __is_compressible(path):
+    return Path(path).suffix in compressible_suffixes
+
+
+def precompress_file(path, level=9):
+    gzip_path = path + ".gz"
+    stat = os.stat(path)
+    # the .gz copies its source's mtime, so matching mtimes mean it is current
+    if os.path.exists(gzip_path) and os.stat(gzip_path).st_mtime_ns == stat.st_mtime_ns:
+        return False
+
+    with open(path, "rb") as file:
+        data = file.read()
+    # a fixed header mtime keeps the output identical for identical input
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) >= len(data):
+        if os.path.exists(gzip_path):
+            os.remove(gzip_path)
+        return False
+    # replaced rather than rewritten, the old .gz may be a hard link into a
+    # published generation
+    tmp_path = temp_path(gzip_path)
+    try:
+        with open(tmp_path, "wb") as gzip_file:
+            gzip_file.write(compressed)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, gzip_path)
+    except BaseException:
+        remove_temp_file(tmp_path)
+        raise
+    return True
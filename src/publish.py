@@ -0,0 +1,103 @@
+import os
+import shutil
+import time
+
+from output_file import temp_path
+
+staging_name = "staging"
+generation_prefix = "gen-"
+
+
+def staging_dir(generations_dir):
+    return os.path.join(generations_dir, staging_name)
+
+
+def start_generation(public_dir, generations_dir, clean=False):
+    staging_path = staging_dir(generations_dir)
+    if clean:
+        shutil.rmtree(staging_path, ignore_errors=True)
+    elif os.path.isdir(staging_path):
+        # left by a build that failed before publishing, the manifest
+        # describes it rather than the published generation
+        return staging_path
+
+    os.makedirs(generations_dir, exist_ok=True)
+    if clean or not os.path.islink(public_dir) or not os.path.isdir(public_dir):
+        # a plain public dir was written with other output paths, so every
+        # page is rebuilt anyway
+        os.makedirs(staging_path)
+        return staging_path
+    link_tree(os.path.realpath(public_dir), staging_path)
+    return staging_path
+
+
+def unlink_published(public_dir):
+    # a build without --atomic writes in place, into the published generation
+    # if public were left pointing at it
+    if not os.path.islink(public_dir):
+        return False
+    os.unlink(public_dir)
+    return True
+
+
+def link_tree(source_dir, target_dir):
+    # every output is replaced rather than rewritten, so a hard link shares
+    # a file only until the build changes it
+    for current_dir, dir_names, file_names in os.walk(source_dir):
+        relative_dir = os.path.relpath(current_dir, source_dir)
+        os.makedirs(os.path.normpath(os.path.join(target_dir, relative_dir)))
+        for file_name in file_names:
+            source_path = os.path.join(current_dir, file_name)
+            target_path = os.path.normpath(
+                os.path.join(target_dir, relative_dir, file_name)
+            )
+            try:
+                os.link(source_path, target_path)
+            except OSError:
+                shutil.copy2(source_path, target_path)
+
+
+def publish_generation(public_dir, generations_dir, keep=3):
+    if os.path.isdir(public_dir) and not os.path.islink(public_dir):
+        # a plain directory can't be replaced by a link, it is moved aside
+        # as the oldest generation and missing for the moment between renames
+        __move_aside(public_dir, generations_dir)
+    generation_path = os.path.join(
+        generations_dir, f"{generation_prefix}{time.time_ns()}"
+    )
+    os.rename(staging_dir(generations_dir), generation_path)
+
+    link_path = temp_path(public_dir)
+    os.symlink(
+        os.path.relpath(generation_path, os.path.dirname(os.path.abspath(public_dir))),
+        link_path,
+    )
+    # renaming over the old link swaps the whole site at once
+    os.replace(link_path, public_dir)
+    return generation_path, prune_generations(public_dir, generations_dir, keep)
+
+
+def __move_aside(public_dir, generations_dir):
+    oldest_path = os.path.join(generations_dir, f"{generation_prefix}0")
+    # left by an earlier switch from a plain build, it is older than the
+    # directory replacing it
+    shutil.rmtree(oldest_path, ignore_errors=True)
+    os.rename(public_dir, oldest_path)
+
+
+def prune_generations(public_dir, generations_dir, keep=3):
+    current_path = os.path.realpath(public_dir)
+    generations = sorted(
+        filter(
+            lambda name: name.startswith(generation_prefix), os.listdir(generations_dir)
+        ),
+        key=lambda name: int(name[len(generation_prefix) :]),
+    )
+    removed = []
+    for name in generations[: max(0, len(generations) - keep)]:
+        path = os.path.join(generations_dir, name)
+        if os.path.realpath(path) == current_path:
+            continue
+        shutil.rmtree(path)
+        removed.append(path)
+    return removed
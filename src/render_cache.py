@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+
+from build_manifest import generator_version
+from output_file import remove_temp_file, temp_path
+
+
+class RenderCache:
+    def __init__(self, dir_path, max_size=256 << 20):
+        self.dir_path = dir_path
+        self.max_size = max_size
+
+    def entry_path(self, source_hash):
+        # entries of older generator versions are never read again and age
+        # out through prune
+        return os.path.join(
+            self.dir_path,
+            str(generator_version),
+            source_hash[:2],
+            source_hash + ".html",
+        )
+
+    def get(self, source_hash):
+        path = self.entry_path(source_hash)
+        try:
+            with open(path) as entry_file:
+                title = json.loads(entry_file.readline())
+            # prune evicts by mtime, so touching an entry marks it recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return title, CachedBody(path)
+
+    def put(self, source_hash, title, content_node):
+        path = self.entry_path(source_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # parallel workers may render the same source, the last rename wins
+        tmp_path = temp_path(path)
+        try:
+            with open(tmp_path, "w") as entry_file:
+                entry_file.write(json.dumps(title) + "\n")
+                content_node.write_to(entry_file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            remove_temp_file(tmp_path)
+            raise
+        return CachedBody(path)
+
+    def prune(self):
+        entries = []
+        for dir_path, _, file_names in os.walk(self.dir_path):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort(reverse=True)
+
+        removed = 0
+        total_size = 0
+        for _, size, path in entries:
+            total_size += size
+            if total_size > self.max_size:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class CachedBody:
+    def __init__(self, path):
+        self.path = path
+
+    def write_to(self, file):
+        with open(self.path) as entry_file:
+            entry_file.readline()
+            shutil.copyfileobj(entry_file, file, 1 << 16)
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+
+# a content directory holding this file uses it for every page below it
+override_template_name = "template.html"
+page_variables = {"Title", "Content"}
+
+__tag_regex = re.compile(r"\{\{\s*(>?)\s*([^{}]*?)\s*\}\}")
+
+
+class Template:
+    def __init__(self, path, segments, source_hash):
+        self.path = path
+        # (literal text, page variable or None) pairs, site variables and
+        # partials are already folded into the literals
+        self.segments = segments
+        self.hash = source_hash
+
+    def render(self, file, title, content_node):
+        for literal, variable in self.segments:
+            file.write(literal)
+            if variable == "Content":
+                content_node.write_to(file)
+            elif variable == "Title":
+                file.write(title)
+
+
+def compile_template(path, variables=None, assets=None):
+    with open(path) as template_file:
+        return compile_template_string(
+            template_file.read(), path, os.path.dirname(path), variables, assets
+        )
+
+
+def compile_template_string(
+    content, path="<string>", base_dir=".", variables=None, assets=None
+):
+    variables = variables or {}
+    for name in sorted(page_variables.intersection(variables)):
+        # it would replace the value of every page
+        raise ValueError(f"Site variable {name} is reserved for pages")
+    digest = hashlib.sha256(json.dumps(variables, sort_keys=True).encode())
+    if assets is not None:
+        # pages link the fingerprinted assets, so they change along with them
+        digest.update(assets.hash.encode())
+    segments = []
+    literals = []
+    tokens = __tokens(content, path, base_dir, variables, digest, [path])
+    for literal, variable in tokens:
+        literals.append(literal)
+        if variable is not None:
+            segments.append((__literal(literals, assets), variable))
+            literals = []
+    segments.append((__literal(literals, assets), None))
+    return Template(path, segments, digest.hexdigest())
+
+
+def __literal(literals, assets):
+    literal = "".join(literals)
+    return literal if assets is None else assets.rewrite_html(literal)
+
+
+def __tokens(content, path, base_dir, variables, digest, including):
+    digest.update(path.encode() + b"\0" + content.encode() + b"\0")
+    pieces = __tag_regex.split(content)
+    yield pieces[0], None
+    for i in range(1, len(pieces), 3):
+        is_partial, name, literal = pieces[i : i + 3]
+        if is_partial:
+            partial_path = os.path.join(base_dir, name)
+            if partial_path in including:
+                raise ValueError(f"Template partial includes itself: {partial_path}")
+            with open(partial_path) as partial_file:
+                partial_content = partial_file.read()
+            yield from __tokens(
+                partial_content,
+                partial_path,
+                os.path.dirname(partial_path),
+                variables,
+                digest,
+                including + [partial_path],
+            )
+        elif name in variables:
+            yield variables[name], None
+        elif name in page_variables:
+            yield "", name
+        else:
+            raise ValueError(f"Unknown template variable {name} in {path}")
+        yield literal, None
+
+
+class TemplateSet:
+    def __init__(
+        self, default_path, content_dir_path=None, variables=None, assets=None
+    ):
+        self.default_path = default_path
+        self.content_dir_path = content_dir_path
+        self.variables = variables or {}
+        self.assets = assets
+        self.templates = {}
+        self.dir_templates = {}
+
+    def get(self, path):
+        template = self.templates.get(path)
+        if template is None:
+            template = compile_template(path, self.variables, self.assets)
+            self.templates[path] = template
+        return template
+
+    def template_for(self, source_path):
+        if self.content_dir_path is None:
+            return self.get(self.default_path)
+        return self.__dir_template(os.path.dirname(source_path))
+
+    def __dir_template(self, dir_path):
+        template = self.dir_templates.get(dir_path)
+        if template is not None:
+            return template
+        override_path = os.path.join(dir_path, override_template_name)
+        if os.path.isfile(override_path):
+            template = self.get(override_path)
+        elif (
+            os.path.normpath(dir_path) == os.path.normpath(self.content_dir_path)
+            or os.path.dirname(dir_path) == dir_path
+        ):
+            template = self.get(self.default_path)
+        else:
+            template = self.__dir_template(os.path.dirname(dir_path))
+        self.dir_templates[dir_path] = template
+        return template
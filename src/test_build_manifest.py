@@ -0,0 +1,107 @@
+import hashlib
+import os
+import unittest
+
+from build_manifest import BuildManifest, generator_version, hash_file
+from fixtures import temp_dir, write_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = temp_dir(self)
+        self.manifest_path = os.path.join(self.tmp_dir, "cache", "manifest.json")
+        self.dest_path = os.path.join(self.tmp_dir, "index.html")
+        write_file(self.dest_path, "<html></html>")
+
+    def test_hash_file(self):
+        path = os.path.join(self.tmp_dir, "a.md")
+        write_file(path, "# title")
+        self.assertEqual(hash_file(path), hashlib.sha256(b"# title").hexdigest())
+
+    def test_load_missing_manifest_is_empty(self):
+        self.assertEqual(BuildManifest.load(self.manifest_path).pages, {})
+
+    def test_recorded_page_is_current(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        self.assertTrue(
+            manifest.is_page_current("index.md", "src", "tpl", self.dest_path)
+        )
+
+    def test_changed_inputs_are_not_current(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        self.assertFalse(
+            manifest.is_page_current("index.md", "src2", "tpl", self.dest_path)
+        )
+        self.assertFalse(
+            manifest.is_page_current("index.md", "src", "tpl2", self.dest_path)
+        )
+        self.assertFalse(
+            manifest.is_page_current("other.md", "src", "tpl", self.dest_path)
+        )
+
+    def test_missing_output_is_not_current(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        os.remove(self.dest_path)
+        self.assertFalse(
+            manifest.is_page_current("index.md", "src", "tpl", self.dest_path)
+        )
+
+    def test_save_and_load_round_trip(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        manifest.save()
+        self.assertEqual(BuildManifest.load(self.manifest_path).pages, manifest.pages)
+
+    def test_load_discards_other_generator_version(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        manifest.save()
+        write_file(
+            self.manifest_path,
+            f'{{"version": {generator_version + 1}, "pages": {{"a": {{}}}}}}',
+        )
+        self.assertEqual(BuildManifest.load(self.manifest_path).pages, {})
+
+    def test_remove_stale_pages(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_page("index.md", "src", "tpl", self.dest_path)
+        kept_path = os.path.join(self.tmp_dir, "kept.html")
+        write_file(kept_path, "<html></html>")
+        manifest.record_page("kept.md", "src", "tpl", kept_path)
+
+        self.assertEqual(manifest.remove_stale_pages(["kept.md"]), [self.dest_path])
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assertTrue(os.path.exists(kept_path))
+        self.assertEqual(list(manifest.pages), ["kept.md"])
+
+    def test_recorded_asset_is_current(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_asset("a.css", {"size": 1, "mtime": 2}, self.dest_path)
+        self.assertTrue(
+            manifest.is_asset_current("a.css", {"size": 1, "mtime": 2}, self.dest_path)
+        )
+        self.assertFalse(
+            manifest.is_asset_current("a.css", {"size": 1, "mtime": 3}, self.dest_path)
+        )
+
+    def test_asset_outputs(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_asset("a.css", {"size": 1, "mtime": 2}, "a.css", "a.1234.css")
+        manifest.record_asset("b.json.gz", {"size": 1, "mtime": 2}, "b.json.gz")
+        self.assertEqual(manifest.asset_outputs(), {"a.css", "a.1234.css", "b.json.gz"})
+
+    def test_remove_stale_assets(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.record_asset("a.css", {"size": 1, "mtime": 2}, self.dest_path)
+        manifest.save()
+        manifest = BuildManifest.load(self.manifest_path)
+        self.assertEqual(manifest.remove_stale_assets([]), [self.dest_path])
+        self.assertFalse(os.path.exists(self.dest_path))
+        self.assertEqual(manifest.assets, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
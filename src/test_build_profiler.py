@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from build_profiler import BuildProfiler, null_profiler
+from fixtures import temp_dir, write_file
+from generate_page import generate_pages_recursive
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def test_span_records_complete_event(self):
+        profiler = BuildProfiler()
+        with profiler.span("read", path="index.md"):
+            pass
+        event = profiler.events[0]
+        self.assertEqual(event["name"], "read")
+        self.assertEqual(event["cat"], "stage")
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["args"], {"path": "index.md"})
+        self.assertGreaterEqual(event["dur"], 0)
+
+    def test_span_is_recorded_when_stage_fails(self):
+        profiler = BuildProfiler()
+        with self.assertRaises(ValueError):
+            with profiler.span("inline"):
+                raise ValueError("bad markdown")
+        self.assertEqual(len(profiler.events), 1)
+
+    def test_summary_orders_slowest_first(self):
+        profiler = BuildProfiler()
+        profiler.add_events(
+            [
+                event("fast.md", "page", 1000),
+                event("slow.md", "page", 5000),
+                event("read", "stage", 500),
+                event("inline", "stage", 2000),
+                event("read", "stage", 700),
+            ]
+        )
+        self.assertEqual(
+            profiler.summary(),
+            "\n".join(
+                [
+                    "Slowest pages:",
+                    "      5.00 ms  slow.md",
+                    "      1.00 ms  fast.md",
+                    "Time per stage:",
+                    "      2.00 ms  inline (1x)",
+                    "      1.20 ms  read (2x)",
+                ]
+            ),
+        )
+
+    def test_write_trace(self):
+        tmp_dir = temp_dir(self)
+        trace_path = os.path.join(tmp_dir, "cache", "trace.json")
+        profiler = BuildProfiler()
+        with profiler.span("build", "build"):
+            pass
+        profiler.write_trace(trace_path)
+        with open(trace_path) as trace_file:
+            trace = json.load(trace_file)
+        self.assertEqual(trace["traceEvents"], profiler.events)
+
+    def test_page_sums_stages_without_nested_time(self):
+        profiler = BuildProfiler()
+        with profiler.page("index.md") as stage:
+            for _ in range(3):
+                with stage("write"):
+                    with stage("inline"):
+                        time.sleep(0.002)
+        page, write, inline = profiler.events
+        self.assertEqual((page["name"], page["cat"]), ("index.md", "page"))
+        self.assertEqual(
+            [(write["name"], write["cat"]), (inline["name"], inline["cat"])],
+            [("write", "stage"), ("inline", "stage")],
+        )
+        self.assertGreaterEqual(inline["dur"], 6000)
+        self.assertLess(write["dur"], inline["dur"])
+        self.assertLessEqual(write["dur"] + inline["dur"], page["dur"])
+        self.assertAlmostEqual(inline["ts"], write["ts"] + write["dur"], places=2)
+
+    def test_null_profiler_records_nothing(self):
+        with null_profiler.span("read"):
+            pass
+        with null_profiler.page("index.md") as stage:
+            with stage("read"):
+                pass
+        null_profiler.add_events([event("read", "stage", 1)])
+        self.assertEqual(null_profiler.events, [])
+
+
+class TestProfiledBuild(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.content_dir = os.path.join(tmp_dir, "content")
+        self.public_dir = os.path.join(tmp_dir, "public")
+        self.template_path = os.path.join(tmp_dir, "template.html")
+        write_file(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        for i in range(3):
+            write_file(os.path.join(self.content_dir, f"page{i}.md"), f"# Page {i}")
+
+    def build(self, jobs):
+        profiler = BuildProfiler()
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content_dir,
+                self.template_path,
+                self.public_dir,
+                jobs=jobs,
+                profiler=profiler,
+            )
+        return profiler
+
+    def test_records_every_page_and_stage(self):
+        for jobs in [1, 2]:
+            profiler = self.build(jobs)
+            pages = sorted(map(lambda event: event["name"], profiler.slowest_pages()))
+            self.assertEqual(
+                pages,
+                list(
+                    map(
+                        lambda i: os.path.join(self.content_dir, f"page{i}.md"),
+                        range(3),
+                    )
+                ),
+            )
+            stages = dict(profiler.stage_totals())
+            self.assertEqual(
+                sorted(stages), ["blocks", "compare", "inline", "read", "write"]
+            )
+            self.assertTrue(all(map(lambda total: total[1] == 3, stages.values())))
+
+
+def event(name, category, duration):
+    return {"name": name, "cat": category, "ph": "X", "ts": 0, "dur": duration}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from build_manifest import BuildManifest
+from copy_static_to_public import copy_static_to_public, file_signature
+from fixtures import read_file, temp_dir, write_file
+from png_optimizer import PngOptimizer
+
+
+class TestSyncStaticToPublic(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.static_dir = os.path.join(tmp_dir, "static")
+        self.public_dir = os.path.join(tmp_dir, "public")
+        write_file(os.path.join(self.static_dir, "index.css"), "body {}")
+        write_file(os.path.join(self.static_dir, "images", "a.png"), "png")
+        self.manifest = BuildManifest(os.path.join(tmp_dir, "manifest.json"))
+
+        self.png_cache_dir = os.path.join(tmp_dir, "png")
+
+    def sync(self, checksum=False, png_optimizer=None, fingerprint=False):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assets = copy_static_to_public(
+                self.static_dir,
+                self.public_dir,
+                self.manifest,
+                checksum,
+                png_optimizer=png_optimizer,
+                fingerprint=fingerprint,
+            )
+        return output.getvalue()
+
+    def test_copies_new_files(self):
+        self.sync()
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "index.css")), "body {}"
+        )
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "images", "a.png")), "png"
+        )
+
+    def test_unchanged_files_are_not_copied(self):
+        self.sync()
+        self.assertEqual(self.sync(), "")
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        css_path = os.path.join(self.static_dir, "index.css")
+        write_file(css_path, "body { color: red }")
+        log = self.sync()
+        self.assertIn("index.css", log)
+        self.assertNotIn("a.png", log)
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "index.css")), "body { color: red }"
+        )
+
+    def test_touched_file_is_not_copied_with_checksum(self):
+        self.sync(checksum=True)
+        css_path = os.path.join(self.static_dir, "index.css")
+        stat = os.stat(css_path)
+        os.utime(css_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(self.sync(checksum=True), "")
+        self.assertIn("index.css", self.sync())
+
+    def test_removed_file_is_deleted_from_public(self):
+        self.sync()
+        os.remove(os.path.join(self.static_dir, "images", "a.png"))
+        self.sync()
+        self.assertFalse(os.path.exists(os.path.join(self.public_dir, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public_dir, "index.css")))
+
+    def test_generated_files_survive_sync(self):
+        self.sync()
+        page_path = os.path.join(self.public_dir, "index.html")
+        write_file(page_path, "<html></html>")
+        self.sync()
+        self.assertTrue(os.path.exists(page_path))
+
+    def test_enabling_png_optimizer_recopies_images(self):
+        self.sync()
+        output = self.sync(png_optimizer=PngOptimizer(self.png_cache_dir))
+        self.assertIn("a.png", output)
+        self.assertNotIn("index.css", output)
+        # not a valid PNG, so it is copied unchanged
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "images", "a.png")), "png"
+        )
+        self.assertEqual(self.sync(png_optimizer=PngOptimizer(self.png_cache_dir)), "")
+
+    def test_fingerprinted_copies(self):
+        self.sync(fingerprint=True)
+        fingerprinted_url = self.assets.url_for("/index.css")
+        self.assertRegex(fingerprinted_url, r"^/index\.[0-9a-f]{10}\.css$")
+        fingerprinted_path = os.path.join(self.public_dir, fingerprinted_url[1:])
+        self.assertEqual(read_file(fingerprinted_path), "body {}")
+        self.assertEqual(
+            json.loads(read_file(os.path.join(self.public_dir, "asset-manifest.json"))),
+            self.assets.urls,
+        )
+        self.assertEqual(self.sync(fingerprint=True), "")
+        self.assertEqual(self.assets.url_for("/index.css"), fingerprinted_url)
+
+        write_file(os.path.join(self.static_dir, "index.css"), "body { margin: 0 }")
+        self.sync(fingerprint=True)
+        self.assertNotEqual(self.assets.url_for("/index.css"), fingerprinted_url)
+        self.assertFalse(os.path.exists(fingerprinted_path))
+
+    def test_removed_file_loses_its_fingerprinted_copy(self):
+        self.sync(fingerprint=True)
+        fingerprinted_url = self.assets.url_for("/index.css")
+        os.remove(os.path.join(self.static_dir, "index.css"))
+        self.sync(fingerprint=True)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.public_dir, fingerprinted_url[1:]))
+        )
+        self.assertNotIn("/index.css", self.assets.urls)
+
+    def test_disabling_fingerprints_removes_asset_manifest(self):
+        self.sync(fingerprint=True)
+        fingerprinted_path = os.path.join(
+            self.public_dir, self.assets.url_for("/index.css")[1:]
+        )
+        asset_manifest_path = os.path.join(self.public_dir, "asset-manifest.json")
+        write_file(asset_manifest_path + ".gz", "precompressed")
+        self.sync()
+        self.assertIsNone(self.assets)
+        self.assertFalse(os.path.exists(asset_manifest_path))
+        self.assertFalse(os.path.exists(asset_manifest_path + ".gz"))
+        self.assertFalse(os.path.exists(fingerprinted_path))
+
+    def test_copy_without_manifest_replaces_public(self):
+        write_file(os.path.join(self.public_dir, "old.html"), "<html></html>")
+        copy_static_to_public(self.static_dir, self.public_dir)
+        self.assertEqual(sorted(os.listdir(self.public_dir)), ["images", "index.css"])
+
+
+class TestFileSignature(unittest.TestCase):
+    def test_signature(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as file:
+            file.write("content")
+        self.addCleanup(os.remove, file.name)
+        self.assertEqual(
+            file_signature(file.name),
+            {"size": 7, "mtime": os.stat(file.name).st_mtime_ns},
+        )
+        self.assertEqual(
+            set(file_signature(file.name, checksum=True)), {"size", "hash"}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import unittest
+
+from discovery import DiscoveryIndex, discover_files
+from fixtures import temp_dir, write_file
+
+
+class TestDiscoverFiles(unittest.TestCase):
+    def setUp(self):
+        self.root = temp_dir(self)
+        self.content_dir = os.path.join(self.root, "content")
+        for path in ["b.md", "a/z.md", "a/notes.txt", "c.md", "drafts/d.md"]:
+            write_file(os.path.join(self.content_dir, path))
+
+    def relative_files(self, **kwargs):
+        files = discover_files(self.content_dir, **kwargs)
+        return list(map(lambda path: os.path.relpath(path, self.content_dir), files))
+
+    def test_sorted_depth_first(self):
+        self.assertEqual(
+            self.relative_files(),
+            ["a/notes.txt", "a/z.md", "b.md", "c.md", "drafts/d.md"],
+        )
+
+    def test_include_and_exclude_globs(self):
+        self.assertEqual(
+            self.relative_files(include=["*.md"], exclude=["drafts", "c.*"]),
+            ["a/z.md", "b.md"],
+        )
+
+    def test_excluded_directory_is_not_walked(self):
+        index = DiscoveryIndex(os.path.join(self.root, "index.json"))
+        age_tree(self.content_dir)
+        discover_files(self.content_dir, exclude=["drafts"], index=index)
+        self.assertNotIn(os.path.join(self.content_dir, "drafts"), index.scanned)
+
+
+class TestDiscoveryIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = temp_dir(self)
+        self.content_dir = os.path.join(self.root, "content")
+        write_file(os.path.join(self.content_dir, "index.md"))
+        write_file(os.path.join(self.content_dir, "blog", "post.md"))
+        self.index_path = os.path.join(self.root, "cache", "discovery.json")
+
+    def scan(self):
+        index = DiscoveryIndex.load(self.index_path)
+        files = discover_files(self.content_dir, index=index)
+        index.save()
+        return files
+
+    def test_unchanged_directory_listing_is_reused(self):
+        age_tree(self.content_dir)
+        self.scan()
+        # without an mtime change the index is trusted over the directory
+        blog_dir = os.path.join(self.content_dir, "blog")
+        write_file(os.path.join(blog_dir, "new.md"))
+        age_tree(self.content_dir)
+        self.assertNotIn(os.path.join(blog_dir, "new.md"), self.scan())
+
+    def test_changed_directory_is_listed_again(self):
+        age_tree(self.content_dir)
+        self.scan()
+        write_file(os.path.join(self.content_dir, "blog", "new.md"))
+        self.assertIn(os.path.join(self.content_dir, "blog", "new.md"), self.scan())
+
+    def test_recently_changed_directory_is_not_cached(self):
+        self.scan()
+        self.assertEqual(DiscoveryIndex.load(self.index_path).dirs, {})
+
+    def test_removed_directory_is_dropped(self):
+        age_tree(self.content_dir)
+        self.scan()
+        blog_dir = os.path.join(self.content_dir, "blog")
+        os.remove(os.path.join(blog_dir, "post.md"))
+        os.rmdir(blog_dir)
+        age_tree(self.content_dir, 10**18 + 10**9)
+        self.scan()
+        self.assertEqual(
+            list(DiscoveryIndex.load(self.index_path).dirs), [self.content_dir]
+        )
+
+
+def age_tree(root, mtime_ns=10**18):
+    # far outside the racy window so the listings are cached
+    for dir_path, _, _ in os.walk(root):
+        os.utime(dir_path, ns=(mtime_ns, mtime_ns))
+
+
+if __name__ == "__main__":
+    unittest.main()
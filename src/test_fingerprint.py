@@ -0,0 +1,77 @@
+import os
+import unittest
+
+from fingerprint import AssetManifest, fingerprint_path
+from fixtures import temp_dir
+from htmlnode import LeafNode, ParentNode
+
+
+class TestFingerprintPath(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = temp_dir(self)
+
+    def write(self, name, content="body {}"):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_hash_goes_before_the_suffix(self):
+        path = fingerprint_path(self.write("index.css"))
+        self.assertRegex(os.path.basename(path), r"^index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(os.path.dirname(path), self.tmp_dir)
+
+    def test_name_depends_on_content(self):
+        first = fingerprint_path(self.write("index.css", "a"))
+        second = fingerprint_path(self.write("index.css", "b"))
+        self.assertNotEqual(first, second)
+
+    def test_names_without_suffix(self):
+        path = fingerprint_path(self.write(".htaccess"))
+        self.assertRegex(os.path.basename(path), r"^\.htaccess\.[0-9a-f]{10}$")
+
+    def test_pages_are_not_fingerprinted(self):
+        self.assertIsNone(fingerprint_path(self.write("about.html")))
+
+
+class TestAssetManifest(unittest.TestCase):
+    assets = AssetManifest({"/index.css": "/index.0123456789.css"})
+
+    def test_url_for(self):
+        self.assertEqual(self.assets.url_for("/index.css"), "/index.0123456789.css")
+        self.assertEqual(
+            self.assets.url_for("/index.css?v=2#top"), "/index.0123456789.css?v=2#top"
+        )
+        self.assertEqual(self.assets.url_for("index.css"), "index.css")
+        self.assertEqual(
+            self.assets.url_for("https://a.b/index.css"), "https://a.b/index.css"
+        )
+
+    def test_rewrite_html(self):
+        self.assertEqual(
+            self.assets.rewrite_html(
+                "<link href='/index.css'><a href=\"/other.css\">/index.css</a>"
+            ),
+            "<link href='/index.0123456789.css'><a href=\"/other.css\">/index.css</a>",
+        )
+
+    def test_rewrite_node(self):
+        node = ParentNode(
+            "p",
+            [
+                LeafNode("a", "css", {"href": "/index.css"}),
+                LeafNode("img", "", {"src": "/index.css", "alt": "/index.css"}),
+            ],
+        )
+        self.assertEqual(
+            self.assets.rewrite_node(node).to_html(),
+            '<p><a href="/index.0123456789.css">css</a>'
+            '<img src="/index.0123456789.css" alt="/index.css"></img></p>',
+        )
+
+    def test_hash_depends_on_urls(self):
+        self.assertNotEqual(self.assets.hash, AssetManifest().hash)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,14 @@
+import io
+import os
+import shutil
 import unittest
+from contextlib import redirect_stdout
 
-from generate_page import extract_title
+from build_manifest import BuildManifest
+from fixtures import read_file, temp_dir, write_file
+from generate_page import extract_title, generate_pages_recursive
 from htmlnode import ParentNode, LeafNode
+from markdown_to_html import BlockMemo, markdown_to_html_node
 
 
 class TestGeneratePage(unittest.TestCase):
@@ -26,6 +33,178 @@ class TestGeneratePage(unittest.TestCase):
         self.assertEqual(extract_title(page), "header text")
 
 
+class TestGeneratePagesRecursive(unittest.TestCase):
+    def setUp(self):
+        self.root = temp_dir(self)
+        self.content_dir = os.path.join(self.root, "content")
+        self.public_dir = os.path.join(self.root, "public")
+        self.template_path = os.path.join(self.root, "template.html")
+        write_file(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content_dir, "index.md"), "# Home")
+        write_file(os.path.join(self.content_dir, "blog", "post.md"), "# Post")
+        self.manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+
+    def build(self, jobs=1):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            generate_pages_recursive(
+                self.content_dir,
+                self.template_path,
+                self.public_dir,
+                self.manifest,
+                jobs=jobs,
+            )
+        return output.getvalue()
+
+    def test_generates_all_pages(self):
+        self.build()
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "blog", "post.html")),
+            "<title>Post</title><div><h1>Post</h1></div>",
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.public_dir, "index.html")))
+
+    def test_rebuild_skips_unchanged_pages(self):
+        self.build()
+        self.assertEqual(self.build(), "")
+
+    def test_rebuild_only_changed_page(self):
+        self.build()
+        write_file(os.path.join(self.content_dir, "index.md"), "# Home, edited")
+        log = self.build()
+        self.assertIn("index.md", log)
+        self.assertNotIn("post.md", log)
+
+    def test_template_change_rebuilds_every_page(self):
+        self.build()
+        write_file(self.template_path, "{{ Content }}")
+        log = self.build()
+        self.assertIn("index.md", log)
+        self.assertIn("post.md", log)
+
+    def test_directory_template_change_rebuilds_its_pages(self):
+        blog_template_path = os.path.join(self.content_dir, "blog", "template.html")
+        write_file(blog_template_path, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.build()
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "blog", "post.html")),
+            "<h2>Post</h2><div><h1>Post</h1></div>",
+        )
+        write_file(blog_template_path, "<h3>{{ Title }}</h3>{{ Content }}")
+        log = self.build()
+        self.assertNotIn("index.md", log)
+        self.assertIn("post.md", log)
+
+    def test_identical_output_is_not_rewritten(self):
+        self.build()
+        post_path = os.path.join(self.public_dir, "blog", "post.html")
+        os.utime(post_path, ns=(0, 0))
+        # same rendered html under a template with a different hash
+        write_file(self.template_path, "<title>{{Title}}</title>{{Content}}")
+        log = self.build()
+        self.assertIn("2 page(s) rendered identical output", log)
+        self.assertEqual(os.stat(post_path).st_mtime_ns, 0)
+
+    def test_failed_page_keeps_previous_output(self):
+        self.build()
+        write_file(os.path.join(self.content_dir, "index.md"), "# Home\n\n**bold")
+        with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+            self.build()
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "index.html")),
+            "<title>Home</title><div><h1>Home</h1></div>",
+        )
+        self.assertEqual(sorted(os.listdir(self.public_dir)), ["blog", "index.html"])
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content_dir, "blog", "post.md"))
+        self.build()
+        self.assertFalse(
+            os.path.exists(os.path.join(self.public_dir, "blog", "post.html"))
+        )
+        # the emptied directory goes too, the public root stays
+        self.assertEqual(os.listdir(self.public_dir), ["index.html"])
+        os.remove(os.path.join(self.content_dir, "index.md"))
+        self.build()
+        self.assertEqual(os.listdir(self.public_dir), [])
+
+    def test_parallel_build_matches_sequential_build(self):
+        for i in range(8):
+            write_file(os.path.join(self.content_dir, f"page{i}.md"), f"# Page {i}")
+        sequential_log = self.build()
+        sequential_pages = read_tree(self.public_dir)
+        self.manifest.pages = {}
+        shutil.rmtree(self.public_dir)
+        parallel_log = self.build(jobs=4)
+        self.assertEqual(parallel_log, sequential_log)
+        self.assertEqual(read_tree(self.public_dir), sequential_pages)
+
+    def test_failed_pages_are_reported_without_stopping_the_build(self):
+        write_file(os.path.join(self.content_dir, "broken.md"), "no title")
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(ValueError):
+            generate_pages_recursive(
+                self.content_dir, self.template_path, self.public_dir, self.manifest
+            )
+        self.assertIn("Failed to generate page from", output.getvalue())
+        self.assertIn("broken.md", output.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.public_dir, "index.html")))
+        self.assertNotIn(
+            os.path.join(self.content_dir, "broken.md"), self.manifest.pages
+        )
+
+    def test_streamed_page_matches_markdown_to_html(self):
+        # long enough to span several read chunks
+        markdown = "# Log\n\n" + "\n\n".join(
+            map(lambda i: f"* change **{i}**\n* fix `{i}`", range(5000))
+        )
+        write_file(os.path.join(self.content_dir, "log.md"), markdown)
+        self.build()
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "log.html")),
+            f"<title>Log</title>{markdown_to_html_node(markdown).to_html()}",
+        )
+
+    def test_block_memo_stats_include_parallel_workers(self):
+        for i in range(4):
+            write_file(
+                os.path.join(self.content_dir, f"page{i}.md"),
+                f"# Page {i}\n\nshared notice",
+            )
+        block_memo = BlockMemo()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            generate_pages_recursive(
+                self.content_dir,
+                self.template_path,
+                self.public_dir,
+                jobs=2,
+                block_memo=block_memo,
+            )
+        self.assertEqual(block_memo.hits + block_memo.misses, 4)
+        self.assertIn(block_memo.summary(), output.getvalue())
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "page3.html")),
+            "<title>Page 3</title><div><h1>Page 3</h1><p>shared notice</p></div>",
+        )
+
+    def test_error_late_in_page_removes_partial_output(self):
+        write_file(os.path.join(self.content_dir, "late.md"), "# Late\n\n**bold")
+        with redirect_stdout(io.StringIO()), self.assertRaises(ValueError):
+            self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public_dir, "late.html")))
+
+
+def read_tree(root):
+    files = {}
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            files[os.path.relpath(path, root)] = read_file(path)
+    return files
+
+
 def create_page(children):
     return ParentNode("div", children)
 
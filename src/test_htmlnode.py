@@ -1,6 +1,13 @@
+import io
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node
+from htmlnode import (
+    HTMLNode,
+    LeafNode,
+    ParentNode,
+    StreamingParentNode,
+    text_node_to_html_node,
+)
 from textnode import (
     TextNode,
     text_type_text,
@@ -69,6 +76,11 @@ class TestHTMLNode(unittest.TestCase):
         )
         self.assertNotEqual(node, HTMLNode("<a>", "some link", None, {}))
 
+    def test_has_no_instance_dict(self):
+        self.assertFalse(hasattr(HTMLNode(), "__dict__"))
+        self.assertFalse(hasattr(LeafNode("b", "bold"), "__dict__"))
+        self.assertFalse(hasattr(ParentNode("p", []), "__dict__"))
+
     def test_base_to_html(self):
         with self.assertRaises(NotImplementedError):
             HTMLNode().to_html()
@@ -169,6 +181,43 @@ class TestParentNode(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, ("Invalid HTML: no tag")):
             ParentNode(None, None).to_html()
 
+    def test_iter_html_streams_fragments(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, " text")])],
+            {"class": "page"},
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            [
+                '<div class="page">',
+                "<p>",
+                "<b>Bold text</b>",
+                " text",
+                "</p>",
+                "</div>",
+            ],
+        )
+
+    def test_write_to(self):
+        node = ParentNode("p", [LeafNode("b", "Bold text"), LeafNode(None, " text")])
+        file = io.StringIO()
+        node.write_to(file)
+        self.assertEqual(file.getvalue(), node.to_html())
+
+    def test_deeply_nested_to_html(self):
+        node = LeafNode(None, "text")
+        for _ in range(10000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), len("text") + 10000 * len("<span></span>"))
+
+    def test_nested_no_children_iter_html(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaisesRegex(ValueError, ("ParentNode must have children")):
+            list(node.iter_html())
+
     def test_repr(self):
         node = ParentNode(
             "div",
@@ -185,6 +234,33 @@ class TestParentNode(unittest.TestCase):
         )
 
 
+class TestStreamingParentNode(unittest.TestCase):
+    def test_renders_like_parent_node(self):
+        children = [
+            ParentNode("h1", [LeafNode(None, "Title")]),
+            LeafNode("p", "text"),
+        ]
+        node = StreamingParentNode("div", iter(children))
+        self.assertEqual(node.to_html(), ParentNode("div", children).to_html())
+
+    def test_consumes_children_while_rendering(self):
+        def children():
+            yield LeafNode("p", "first")
+            raise ValueError("second child failed")
+
+        html = StreamingParentNode("div", children()).iter_html()
+        self.assertEqual(next(html), "<div>")
+        self.assertEqual(next(html), "<p>first</p>")
+        with self.assertRaises(ValueError):
+            next(html)
+
+    def test_inside_parent_node(self):
+        node = ParentNode(
+            "body", [StreamingParentNode("div", iter([LeafNode("b", "x")]))]
+        )
+        self.assertEqual(node.to_html(), "<body><div><b>x</b></div></body>")
+
+
 class TestTextNodeToHtmlNode(unittest.TestCase):
     def test_normal_text(self):
         node = TextNode("normal text", text_type_text)
@@ -3,6 +3,7 @@ import textwrap
 
 from markdown_block_parser import (
     text_to_blocks,
+    iter_blocks,
     block_to_block_type,
     block_type_paragraph,
     block_type_heading_1,
@@ -123,5 +124,33 @@ class TestBlockToBlockType(unittest.TestCase):
         self.assertEqual(block_to_block_type("foo\n>bar"), block_type_paragraph)
 
 
+class TestIterBlocks(unittest.TestCase):
+    def test_matches_text_to_blocks(self):
+        texts = [
+            "",
+            "some text",
+            "\n\nparagraph 1\n\n\n\n\nparagraph 2\n\n",
+            "# heading\n\n \n\n* item\n* item\n\n\n```\ncode\n```",
+        ]
+        for text in texts:
+            expected = text_to_blocks(text)
+            self.assertEqual(list(iter_blocks([text])), expected)
+            self.assertEqual(list(iter_blocks(text.splitlines(True))), expected)
+            self.assertEqual(list(iter_blocks(text)), expected)
+
+    def test_separator_split_across_chunks(self):
+        self.assertEqual(list(iter_blocks(["a\n", "\nb"])), ["a", "b"])
+        self.assertEqual(list(iter_blocks(["a\n", "\n", "\nb"])), ["a", "b"])
+        self.assertEqual(list(iter_blocks(["a\n\n", "\nb"])), ["a", "b"])
+
+    def test_yields_blocks_lazily(self):
+        def lines():
+            yield "# title\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())), "# title")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 import textwrap
 
@@ -17,6 +18,7 @@ from markdown_parser import (
     split_nodes_image,
     split_nodes_link,
     text_to_textnodes,
+    text_to_textnodes_multipass,
 )
 
 
@@ -269,6 +271,80 @@ class TestTextToTextNodes(TestSplitBase):
             ],
         )
 
+    def test_empty_text(self):
+        self.assertEqual(text_to_textnodes(""), [TextNode("", text_type_text)])
+
+    def test_nested_inline_styles(self):
+        self.assert_split_result(
+            text_to_textnodes("**bold `code` and *italic* **"),
+            [
+                TextNode("bold ", text_type_bold),
+                TextNode("code", text_type_code),
+                TextNode(" and ", text_type_bold),
+                TextNode("italic", text_type_italic),
+                TextNode(" ", text_type_bold),
+            ],
+        )
+
+    def test_unmatched_delimiters_raise_in_bold_code_italic_order(self):
+        for text, message in [
+            ("**bold `code *italic", "BOLD"),
+            ("`code **bold** *italic*`", "CODE"),
+            ("*italic `code` italic*", "ITALIC"),
+        ]:
+            with self.assertRaisesRegex(ValueError, message):
+                text_to_textnodes(text)
+
+
+class TestTextToTextNodesMatchesMultipass(TestSplitBase):
+    tokens = [
+        "word",
+        " ",
+        "\n",
+        "**",
+        "*",
+        "`",
+        "!",
+        "[",
+        "]",
+        "(",
+        ")",
+        "](",
+        "[link](https://example.com)",
+        "![image](/images/a.png)",
+    ]
+
+    def assert_same_result(self, text):
+        self.assertEqual(
+            self.__result(text_to_textnodes, text),
+            self.__result(text_to_textnodes_multipass, text),
+            f"for input {text!r}",
+        )
+
+    def test_examples(self):
+        for text in [
+            "This is **text** with an *italic* word and a `code block` and an ![image](https://i.imgur.com/zjjcJKZ.png) and a [link](https://boot.dev)",
+            "`code with *italic* inside` and ![alt [x](y)](z)",
+            "**[bold link](url)** ![[nested](a)](b) [a ![b](c) d](e)",
+            "*italic ending with a star***",
+            "[unclosed link](url and ![unclosed image](url",
+        ]:
+            self.assert_same_result(text)
+
+    def test_random_inputs(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            length = rng.randint(0, 16)
+            self.assert_same_result(
+                "".join(rng.choice(self.tokens) for _ in range(length))
+            )
+
+    def __result(self, text_to_nodes, text):
+        try:
+            return text_to_nodes(text)
+        except ValueError as error:
+            return str(error)
+
 
 class TestExtractImages(unittest.TestCase):
     def test_extract_no_images(self):
@@ -1,5 +1,6 @@
 import unittest
-from markdown_to_html import block_to_html_node, markdown_to_html_node
+from fingerprint import AssetManifest
+from markdown_to_html import BlockMemo, block_to_html_node, markdown_to_html_node
 from markdown_block_parser import (
     block_type_paragraph,
     block_type_heading_1,
@@ -161,5 +162,58 @@ two lines</p></blockquote><pre><code>for i in range(1,7):
         )
 
 
+class TestBlockMemo(unittest.TestCase):
+    markdown = "# Title\n\nshared **notice**\n\n* a\n* b\n\nshared **notice**"
+
+    def test_memoized_html_matches(self):
+        memo = BlockMemo()
+        expected_html = markdown_to_html_node(self.markdown).to_html()
+        for _ in range(2):
+            self.assertEqual(
+                markdown_to_html_node(self.markdown, memo).to_html(), expected_html
+            )
+        self.assertEqual((memo.hits, memo.misses), (4, 2))
+        self.assertEqual(memo.summary(), "Block memo: 4 hits, 2 misses (67% hit rate)")
+
+    def test_title_block_keeps_its_node_tree(self):
+        memo = BlockMemo()
+        node = markdown_to_html_node(self.markdown, memo)
+        self.assertEqual(node.children[0].tag, "h1")
+        self.assertEqual(node.children[0].children[0].value, "Title")
+
+    def test_evicts_least_recently_used(self):
+        memo = BlockMemo(max_size=60, max_entry_size=60)
+        memo.render("first block", block_type_paragraph)
+        memo.render("second block", block_type_paragraph)
+        memo.render("first block", block_type_paragraph)
+        memo.render("third block", block_type_paragraph)
+        self.assertEqual(
+            list(map(lambda key: key[0], memo.entries)),
+            ["first block", "third block"],
+        )
+        self.assertLessEqual(memo.size, 60)
+
+    def test_large_blocks_are_not_memoized(self):
+        memo = BlockMemo(max_size=800)
+        node = memo.render("x" * 200, block_type_paragraph)
+        self.assertEqual(node.to_html(), f"<p>{'x' * 200}</p>")
+        self.assertEqual(len(memo.entries), 0)
+
+    def test_asset_urls_are_fingerprinted(self):
+        memo = BlockMemo()
+        markdown = "# Title\n\n![alt](/a.png) [link](/a.png?x#y) [other](/b.png)"
+        first = AssetManifest({"/a.png": "/a.0123456789.png"})
+        second = AssetManifest({"/a.png": "/a.abcdefabcd.png"})
+        self.assertIn(
+            '<img src="/a.0123456789.png" alt="alt"></img> '
+            '<a href="/a.0123456789.png?x#y">link</a> <a href="/b.png">other</a>',
+            markdown_to_html_node(markdown, memo, first).to_html(),
+        )
+        # the memo doesn't hand out html linking the old fingerprint
+        self.assertIn(
+            "/a.abcdefabcd.png", markdown_to_html_node(markdown, memo, second).to_html()
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
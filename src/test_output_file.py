@@ -0,0 +1,51 @@
+import os
+import unittest
+
+from fixtures import read_file, temp_dir, write_file
+from output_file import copy_file, replace_if_changed, same_content
+
+
+class TestOutputFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+        self.dest_path = os.path.join(self.dir, "index.html")
+        self.tmp_path = self.dest_path + ".tmp"
+
+    def test_same_content(self):
+        write_file(self.dest_path, "<p>a</p>")
+        write_file(self.tmp_path, "<p>a</p>")
+        self.assertTrue(same_content(self.tmp_path, self.dest_path))
+        write_file(self.tmp_path, "<p>b</p>")
+        self.assertFalse(same_content(self.tmp_path, self.dest_path))
+        write_file(self.tmp_path, "<p>ab</p>")
+        self.assertFalse(same_content(self.tmp_path, self.dest_path))
+        self.assertFalse(same_content(self.tmp_path, self.dest_path + ".missing"))
+
+    def test_identical_output_is_kept(self):
+        write_file(self.dest_path, "<p>a</p>")
+        os.utime(self.dest_path, ns=(0, 0))
+        write_file(self.tmp_path, "<p>a</p>")
+        self.assertFalse(replace_if_changed(self.tmp_path, self.dest_path))
+        self.assertFalse(os.path.exists(self.tmp_path))
+        self.assertEqual(os.stat(self.dest_path).st_mtime_ns, 0)
+
+    def test_changed_output_replaces_file(self):
+        write_file(self.dest_path, "<p>a</p>")
+        write_file(self.tmp_path, "<p>b</p>")
+        self.assertTrue(replace_if_changed(self.tmp_path, self.dest_path))
+        self.assertEqual(read_file(self.dest_path), "<p>b</p>")
+        self.assertEqual(os.listdir(self.dir), ["index.html"])
+
+    def test_copy_file(self):
+        source_path = os.path.join(self.dir, "source.css")
+        write_file(source_path, "body {}")
+        copy_file(source_path, self.dest_path)
+        self.assertEqual(read_file(self.dest_path), "body {}")
+        self.assertEqual(
+            os.stat(self.dest_path).st_mtime_ns, os.stat(source_path).st_mtime_ns
+        )
+        self.assertEqual(sorted(os.listdir(self.dir)), ["index.html", "source.css"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import struct
+import unittest
+import zlib
+
+from fixtures import temp_dir
+from png_optimizer import PngOptimizer, optimize_png, parse_chunks, png_signature
+
+width = 64
+height = 32
+pixels = b"".join(
+    b"\x00" + bytes((x * 4 + y) % 256 for x in range(width * 3)) for y in range(height)
+)
+
+
+def chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def make_png():
+    compressed = zlib.compress(pixels, 0)
+    middle = len(compressed) // 2
+    return b"".join(
+        [
+            png_signature,
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            chunk(b"tEXt", b"Comment\x00made by a test"),
+            chunk(b"tRNS", b"\x00\x00\x00\x00\x00\x00"),
+            chunk(b"IDAT", compressed[:middle]),
+            chunk(b"IDAT", compressed[middle:]),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+def idat_pixels(data):
+    chunks = parse_chunks(data)
+    return zlib.decompress(
+        b"".join(map(lambda c: c[1], filter(lambda c: c[0] == b"IDAT", chunks)))
+    )
+
+
+class TestOptimizePng(unittest.TestCase):
+    def test_recompresses_without_changing_pixels(self):
+        original = make_png()
+        optimized = optimize_png(original)
+        self.assertLess(len(optimized), len(original))
+        self.assertEqual(idat_pixels(optimized), pixels)
+
+    def test_strips_metadata_chunks(self):
+        chunk_types = list(map(lambda c: c[0], parse_chunks(optimize_png(make_png()))))
+        self.assertEqual(chunk_types, [b"IHDR", b"tRNS", b"IDAT", b"IEND"])
+
+    def test_keeps_already_optimal_images(self):
+        optimized = optimize_png(make_png())
+        self.assertEqual(optimize_png(optimized), optimized)
+
+    def test_leaves_invalid_files_alone(self):
+        self.assertEqual(optimize_png(b"not a png"), b"not a png")
+        corrupt = bytearray(make_png())
+        corrupt[40] ^= 0xFF
+        self.assertEqual(optimize_png(bytes(corrupt)), bytes(corrupt))
+
+    def test_leaves_animated_images_alone(self):
+        original = make_png()
+        animated = original[:33] + chunk(b"acTL", bytes(8)) + original[33:]
+        self.assertEqual(optimize_png(animated), animated)
+
+    def test_rejects_pixel_data_of_the_wrong_size(self):
+        original = make_png().replace(
+            struct.pack(">II", width, height), struct.pack(">II", width, height * 2)
+        )
+        # the IHDR CRC no longer matches, so rebuild it
+        ihdr = struct.pack(">IIBBBBB", width, height * 2, 8, 2, 0, 0, 0)
+        original = png_signature + chunk(b"IHDR", ihdr) + original[33:]
+        self.assertEqual(optimize_png(original), original)
+
+
+class TestPngOptimizer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = temp_dir(self)
+        self.optimizer = PngOptimizer(os.path.join(self.tmp_dir, "cache"))
+        self.source_path = os.path.join(self.tmp_dir, "image.png")
+        with open(self.source_path, "wb") as file:
+            file.write(make_png())
+
+    def test_copy_writes_optimized_image_with_source_mtime(self):
+        dest_path = os.path.join(self.tmp_dir, "out.png")
+        original_size, optimized_size = self.optimizer.copy(self.source_path, dest_path)
+        self.assertEqual(original_size, os.path.getsize(self.source_path))
+        self.assertEqual(optimized_size, os.path.getsize(dest_path))
+        self.assertEqual(
+            os.stat(dest_path).st_mtime_ns, os.stat(self.source_path).st_mtime_ns
+        )
+
+    def test_results_are_cached_by_content(self):
+        first = self.optimizer.optimize(make_png())
+        cache_files = []
+        for dir_path, _, file_names in os.walk(self.optimizer.cache_dir):
+            cache_files.extend(
+                map(lambda name: os.path.join(dir_path, name), file_names)
+            )
+        self.assertEqual(len(cache_files), 1)
+        with open(cache_files[0], "wb") as file:
+            file.write(b"cached")
+        self.assertEqual(self.optimizer.optimize(make_png()), b"cached")
+        self.assertNotEqual(first, b"cached")
+
+
+if __name__ == "__main__":
+    unittest.main()
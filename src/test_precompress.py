@@ -0,0 +1,78 @@
+import gzip
+import os
+import unittest
+
+from fixtures import read_bytes, temp_dir, write_file
+from precompress import precompress_dir, precompress_file
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+        self.page_path = os.path.join(self.dir, "blog", "index.html")
+        write_file(self.page_path, "<p>hello</p>" * 100)
+
+    def test_writes_gzip_sibling(self):
+        self.assertEqual(precompress_dir(self.dir), 1)
+        with gzip.open(self.page_path + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>hello</p>" * 100)
+        self.assertEqual(
+            os.stat(self.page_path + ".gz").st_mtime_ns,
+            os.stat(self.page_path).st_mtime_ns,
+        )
+
+    def test_unchanged_file_is_not_recompressed(self):
+        precompress_dir(self.dir)
+        self.assertEqual(precompress_dir(self.dir), 0)
+        write_file(self.page_path, "<p>changed</p>" * 100)
+        self.assertEqual(precompress_dir(self.dir), 1)
+
+    def test_skips_incompressible_files(self):
+        image_path = os.path.join(self.dir, "image.png")
+        write_file(image_path, "png" * 100)
+        tiny_path = os.path.join(self.dir, "tiny.txt")
+        write_file(tiny_path, "a")
+        precompress_dir(self.dir)
+        self.assertFalse(os.path.exists(image_path + ".gz"))
+        self.assertFalse(precompress_file(tiny_path))
+        self.assertFalse(os.path.exists(tiny_path + ".gz"))
+
+    def test_removes_gzip_of_deleted_file(self):
+        precompress_dir(self.dir)
+        os.remove(self.page_path)
+        precompress_dir(self.dir)
+        # the emptied directory is removed, the root is kept
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_static_gzip_files_are_kept(self):
+        data_path = os.path.join(self.dir, "data.json")
+        write_file(data_path, "[1, 2, 3]" * 100)
+        archive_path = os.path.join(self.dir, "archive", "data.json.gz")
+        write_file(archive_path, "static")
+        write_file(data_path + ".gz", "static")
+        precompress_dir(self.dir, static_paths=[archive_path, data_path + ".gz"])
+        self.assertEqual(read_bytes(archive_path), b"static")
+        # a static .gz next to its source isn't replaced either
+        self.assertEqual(read_bytes(data_path + ".gz"), b"static")
+        self.assertTrue(os.path.exists(self.page_path + ".gz"))
+
+    def test_output_is_reproducible(self):
+        precompress_file(self.page_path)
+        first = read_bytes(self.page_path + ".gz")
+        os.remove(self.page_path + ".gz")
+        precompress_file(self.page_path)
+        self.assertEqual(read_bytes(self.page_path + ".gz"), first)
+
+    def test_hard_linked_gzip_is_not_modified(self):
+        precompress_file(self.page_path)
+        link_path = os.path.join(self.dir, "published.html.gz")
+        os.link(self.page_path + ".gz", link_path)
+        published = read_bytes(link_path)
+        write_file(self.page_path, "<p>changed</p>" * 100)
+        precompress_file(self.page_path)
+        self.assertEqual(read_bytes(link_path), published)
+        self.assertNotEqual(read_bytes(self.page_path + ".gz"), published)
+
+
+if __name__ == "__main__":
+    unittest.main()
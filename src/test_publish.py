@@ -0,0 +1,158 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from build_manifest import BuildManifest
+from copy_static_to_public import copy_static_to_public
+from fixtures import read_file, temp_dir, write_file
+from output_file import copy_file
+from publish import (
+    prune_generations,
+    publish_generation,
+    staging_dir,
+    start_generation,
+    unlink_published,
+)
+
+
+class TestPublish(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+        self.public_dir = os.path.join(self.dir, "public")
+        self.generations_dir = os.path.join(self.dir, ".generations")
+
+    def build(self, files, clean=False):
+        staging_path = start_generation(self.public_dir, self.generations_dir, clean)
+        for name, content in files.items():
+            source_path = os.path.join(self.dir, "source.tmp")
+            write_file(source_path, content)
+            target_path = os.path.join(staging_path, name)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            copy_file(source_path, target_path)
+        return publish_generation(self.public_dir, self.generations_dir)
+
+    def test_first_publish_links_public_to_generation(self):
+        generation_path, removed = self.build({"index.html": "home"})
+        self.assertTrue(os.path.islink(self.public_dir))
+        self.assertEqual(
+            os.path.realpath(self.public_dir), os.path.realpath(generation_path)
+        )
+        self.assertEqual(read_file(os.path.join(self.public_dir, "index.html")), "home")
+        self.assertFalse(os.path.isabs(os.readlink(self.public_dir)))
+        self.assertEqual(removed, [])
+
+    def test_staging_mirrors_published_files_with_hard_links(self):
+        self.build({"index.html": "home", "blog/index.html": "blog"})
+        staging_path = start_generation(self.public_dir, self.generations_dir)
+        for name in ("index.html", os.path.join("blog", "index.html")):
+            self.assertTrue(
+                os.path.samefile(
+                    os.path.join(staging_path, name),
+                    os.path.join(self.public_dir, name),
+                )
+            )
+
+    def test_published_generation_is_untouched_by_next_build(self):
+        self.build({"index.html": "home", "about.html": "about"})
+        old_generation = os.path.realpath(self.public_dir)
+        self.build({"index.html": "new home"})
+        self.assertEqual(read_file(os.path.join(old_generation, "index.html")), "home")
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "index.html")), "new home"
+        )
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "about.html")), "about"
+        )
+
+    def test_unpublished_staging_is_reused(self):
+        self.build({"index.html": "home"})
+        staging_path = start_generation(self.public_dir, self.generations_dir)
+        write_file(os.path.join(staging_path, "draft.html"), "draft")
+        # a failed build leaves staging behind for the next one
+        self.assertEqual(
+            start_generation(self.public_dir, self.generations_dir), staging_path
+        )
+        self.assertTrue(os.path.exists(os.path.join(staging_path, "draft.html")))
+
+    def test_clean_generation_starts_empty(self):
+        self.build({"index.html": "home"})
+        staging_path = start_generation(
+            self.public_dir, self.generations_dir, clean=True
+        )
+        self.assertEqual(os.listdir(staging_path), [])
+        self.assertEqual(read_file(os.path.join(self.public_dir, "index.html")), "home")
+
+    def test_plain_public_dir_becomes_oldest_generation(self):
+        write_file(os.path.join(self.public_dir, "index.html"), "old")
+        staging_path = start_generation(self.public_dir, self.generations_dir)
+        self.assertEqual(os.listdir(staging_path), [])
+        self.build({"index.html": "home"})
+        self.assertTrue(os.path.islink(self.public_dir))
+        self.assertEqual(
+            read_file(os.path.join(self.generations_dir, "gen-0", "index.html")),
+            "old",
+        )
+
+    def test_switching_between_plain_and_atomic_builds(self):
+        self.build({"index.html": "first"})
+        for content in ("plain", "plain again", "plain once more"):
+            self.assertTrue(unlink_published(self.public_dir))
+            write_file(os.path.join(self.public_dir, "index.html"), content)
+            generation_path, _ = self.build({"index.html": content.upper()})
+            self.assertEqual(
+                os.path.realpath(self.public_dir), os.path.realpath(generation_path)
+            )
+            self.assertEqual(
+                read_file(os.path.join(self.public_dir, "index.html")),
+                content.upper(),
+            )
+        # the plain directories were moved aside and pruned like any other
+        self.assertEqual(len(os.listdir(self.generations_dir)), 3)
+
+    def test_prunes_oldest_generations(self):
+        generations = []
+        for index in range(5):
+            generation_path, _ = self.build({"index.html": str(index)})
+            generations.append(generation_path)
+        remaining = sorted(
+            filter(lambda name: name != "staging", os.listdir(self.generations_dir))
+        )
+        self.assertEqual(remaining, sorted(map(os.path.basename, generations[-3:])))
+        self.assertEqual(read_file(os.path.join(self.public_dir, "index.html")), "4")
+
+    def test_prune_never_removes_current_generation(self):
+        self.build({"index.html": "home"})
+        current_path = os.path.realpath(self.public_dir)
+        os.makedirs(os.path.join(self.generations_dir, "gen-99999999999999999999"))
+        os.makedirs(os.path.join(self.generations_dir, "gen-99999999999999999998"))
+        removed = prune_generations(self.public_dir, self.generations_dir, keep=1)
+        self.assertTrue(os.path.isdir(current_path))
+        self.assertEqual(
+            removed,
+            [os.path.join(self.generations_dir, "gen-99999999999999999998")],
+        )
+        self.assertFalse(os.path.exists(staging_dir(self.generations_dir)))
+
+    def test_build_without_atomic_leaves_generations_alone(self):
+        generation_path, _ = self.build({"index.html": "home"})
+        self.assertTrue(unlink_published(self.public_dir))
+        self.assertFalse(os.path.exists(self.public_dir))
+
+        static_dir = os.path.join(self.dir, "static")
+        write_file(os.path.join(static_dir, "index.html"), "plain")
+        manifest = BuildManifest(os.path.join(self.dir, "manifest.json"))
+        with redirect_stdout(io.StringIO()):
+            copy_static_to_public(static_dir, self.public_dir, manifest)
+        self.assertFalse(os.path.islink(self.public_dir))
+        self.assertEqual(
+            read_file(os.path.join(self.public_dir, "index.html")), "plain"
+        )
+        self.assertEqual(read_file(os.path.join(generation_path, "index.html")), "home")
+        # a plain directory is already safe to build into
+        self.assertFalse(unlink_published(self.public_dir))
+        self.assertTrue(os.path.isdir(self.public_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from build_manifest import BuildManifest, hash_file
+from fixtures import read_file, temp_dir, write_file
+from generate_page import generate_pages_recursive
+from htmlnode import LeafNode, ParentNode
+from render_cache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.cache = RenderCache(os.path.join(tmp_dir, "render"))
+
+    def test_put_and_get(self):
+        node = ParentNode("div", [LeafNode("h1", "Title")])
+        self.cache.put("abcd", "Title", node)
+        title, body = self.cache.get("abcd")
+        self.assertEqual(title, "Title")
+        output = io.StringIO()
+        body.write_to(output)
+        self.assertEqual(output.getvalue(), "<div><h1>Title</h1></div>")
+
+    def test_get_missing_entry(self):
+        self.assertIsNone(self.cache.get("abcd"))
+
+    def test_failed_render_leaves_no_entry(self):
+        with self.assertRaises(ValueError):
+            self.cache.put("abcd", "Title", ParentNode("div", []))
+        self.assertIsNone(self.cache.get("abcd"))
+        self.assertEqual(list(walk_files(self.cache.dir_path)), [])
+
+    def test_prune_evicts_least_recently_used(self):
+        for i, source_hash in enumerate(["aa01", "bb02", "cc03"]):
+            self.cache.put(source_hash, "Title", LeafNode("p", "x" * 100))
+            path = self.cache.entry_path(source_hash)
+            os.utime(path, ns=(0, i * 10**9))
+        self.cache.get("aa01")
+        self.cache.max_size = 250
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get("bb02"))
+        self.assertIsNotNone(self.cache.get("aa01"))
+        self.assertIsNotNone(self.cache.get("cc03"))
+
+
+class TestCachedBuild(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.content_dir = os.path.join(tmp_dir, "content")
+        self.public_dir = os.path.join(tmp_dir, "public")
+        self.template_path = os.path.join(tmp_dir, "template.html")
+        self.page_path = os.path.join(self.content_dir, "index.md")
+        write_file(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(self.page_path, "# Home\n\ntext")
+        self.manifest = BuildManifest(os.path.join(tmp_dir, "manifest.json"))
+        self.cache = RenderCache(os.path.join(tmp_dir, "render"))
+
+    def build(self):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content_dir,
+                self.template_path,
+                self.public_dir,
+                self.manifest,
+                render_cache=self.cache,
+            )
+        return read_file(os.path.join(self.public_dir, "index.html"))
+
+    def test_template_change_reuses_rendered_body(self):
+        self.assertEqual(
+            self.build(), "<title>Home</title><div><h1>Home</h1><p>text</p></div>"
+        )
+        entry_path = self.cache.entry_path(hash_file(self.page_path))
+        write_file(entry_path, '"Cached"\n<div>cached</div>')
+        write_file(self.template_path, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.assertEqual(self.build(), "<h2>Cached</h2><div>cached</div>")
+
+    def test_source_change_renders_again(self):
+        self.build()
+        write_file(self.page_path, "# Changed")
+        self.assertEqual(
+            self.build(), "<title>Changed</title><div><h1>Changed</h1></div>"
+        )
+
+    def test_source_is_read_once_for_manifest_and_cache(self):
+        with mock.patch("generate_page.hash_file", wraps=hash_file) as hashed:
+            self.build()
+        hashed.assert_called_once_with(self.page_path)
+
+
+def walk_files(root):
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            yield os.path.join(dir_path, file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
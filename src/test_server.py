@@ -0,0 +1,713 @@
+import functools
+import gzip
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import unittest
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer
+
+from fixtures import temp_dir, write_bytes
+
+# server.py runs from the repository root, next to src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import server
+
+
+class TestServerMetrics(unittest.TestCase):
+    @unittest.skipUnless(hasattr(os, "fork"), "prefork workers need os.fork")
+    def test_counters_are_shared_with_forked_workers(self):
+        metrics = server.ServerMetrics()
+        pids = []
+        for _ in range(3):
+            pid = os.fork()
+            if pid == 0:
+                metrics.record(200, 100, 0.002)
+                metrics.cache_lookup(True)
+                os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        metrics.record(404, 10, 5)
+
+        snapshot = metrics.snapshot(server.FileCache(0))
+        self.assertEqual(snapshot["requests"], {"200": 3, "404": 1})
+        self.assertEqual(snapshot["bytes_sent"], 310)
+        self.assertEqual(snapshot["file_cache"]["hits"], 3)
+        self.assertEqual(snapshot["latency_seconds"]["buckets"]["0.0025"], 3)
+        self.assertEqual(snapshot["latency_seconds"]["buckets"]["+Inf"], 4)
+        self.assertAlmostEqual(snapshot["latency_seconds"]["sum"], 5.006)
+
+    def test_prometheus_text_labels_worker_cache_size(self):
+        metrics = server.ServerMetrics()
+        metrics.connection_opened()
+        metrics.record(200, 5, 0.01)
+        text = server.prometheus_text(metrics.snapshot(server.FileCache(0)))
+        self.assertIn('server_requests_total{status="200"} 1\n', text)
+        self.assertIn("server_connections_in_flight 1\n", text)
+        self.assertIn(f'server_file_cache_bytes{{pid="{os.getpid()}"}} 0\n', text)
+        self.assertIn("server_request_duration_seconds_count 1\n", text)
+
+
+class QuietHandler(server.CORSHTTPRequestHandler):
+    request_log = "none"
+
+
+class LoopbackTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+
+    def start_threaded(self, file_cache=None):
+        handler_class = type(
+            "Handler",
+            (QuietHandler,),
+            {"file_cache": file_cache or server.FileCache(0)},
+        )
+        httpd = ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(handler_class, directory=self.dir)
+        )
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(httpd.shutdown)
+        return httpd.server_address
+
+    def start_async(self, file_cache=None):
+        sock = socket.create_server(("127.0.0.1", 0))
+        httpd = server.AsyncHTTPServer(
+            sock.getsockname(),
+            self.dir,
+            file_cache=file_cache,
+            sock=sock,
+            request_log="none",
+        )
+        thread = threading.Thread(target=httpd.serve_forever)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while httpd.stop is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.addCleanup(sock.close)
+        self.addCleanup(self.stop_async, httpd, thread)
+        self.async_server = httpd
+        self.async_thread = thread
+        return sock.getsockname()
+
+    def stop_async(self, httpd, thread):
+        if thread.is_alive():
+            httpd.shutdown()
+            thread.join()
+
+    def request(self, address, path, headers=None):
+        connection = http.client.HTTPConnection(*address, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response, response.read()
+
+
+class TestAsyncHTTPServer(LoopbackTestCase):
+    def setUp(self):
+        super().setUp()
+        write_bytes(os.path.join(self.dir, "secret.txt"), b"secret")
+        self.dir = os.path.join(self.dir, "site")
+        write_bytes(os.path.join(self.dir, "index.html"), b"home")
+        write_bytes(os.path.join(self.dir, "blog", "index.html"), b"blog")
+        os.makedirs(os.path.join(self.dir, "empty"))
+        self.address = self.start_async()
+
+    def connect(self):
+        connection = socket.create_connection(self.address, timeout=5)
+        self.addCleanup(connection.close)
+        return connection, connection.makefile("rb")
+
+    def exchange(self, connection, response_file, request_line, *headers):
+        lines = [request_line, *headers]
+        connection.sendall(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        status_line = response_file.readline().decode("latin-1")
+        response_headers = {}
+        while True:
+            line = response_file.readline().decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        body = response_file.read(int(response_headers.get("content-length", 0)))
+        return int(status_line.split(" ")[1]), response_headers, body
+
+    def test_keep_alive_serves_several_requests_on_one_connection(self):
+        connection, response_file = self.connect()
+        status, headers, body = self.exchange(
+            connection, response_file, "GET / HTTP/1.1", "Host: localhost"
+        )
+        self.assertEqual((status, body), (200, b"home"))
+        self.assertNotEqual(headers.get("connection"), "close")
+        status, _, body = self.exchange(
+            connection, response_file, "GET /blog/ HTTP/1.1", "Host: localhost"
+        )
+        self.assertEqual((status, body), (200, b"blog"))
+
+    def test_connection_header_and_http_version(self):
+        for request_line, headers, keep_alive in (
+            ("GET / HTTP/1.1", ["Connection: close"], False),
+            ("GET / HTTP/1.0", [], False),
+            ("GET / HTTP/1.0", ["Connection: keep-alive"], True),
+        ):
+            with self.subTest(request=request_line, headers=headers):
+                connection, response_file = self.connect()
+                status, response_headers, _ = self.exchange(
+                    connection, response_file, request_line, *headers
+                )
+                self.assertEqual(status, 200)
+                if keep_alive:
+                    self.assertEqual(response_headers["connection"], "keep-alive")
+                    status, _, _ = self.exchange(
+                        connection, response_file, request_line, *headers
+                    )
+                    self.assertEqual(status, 200)
+                else:
+                    self.assertEqual(response_headers["connection"], "close")
+                    self.assertEqual(response_file.read(), b"")
+
+    def test_malformed_request_line(self):
+        connection, response_file = self.connect()
+        status, _, _ = self.exchange(connection, response_file, "GARBAGE")
+        self.assertEqual(status, 400)
+        self.assertEqual(response_file.read(), b"")
+
+    def test_paths_outside_the_directory_are_not_served(self):
+        connection, response_file = self.connect()
+        for path in ("/../secret.txt", "/%2e%2e/secret.txt", "/blog/../../secret.txt"):
+            status, _, body = self.exchange(
+                connection, response_file, f"GET {path} HTTP/1.1"
+            )
+            self.assertEqual(status, 404)
+            self.assertNotIn(b"secret", body)
+
+    def test_redirects_and_not_found(self):
+        connection, response_file = self.connect()
+        status, headers, _ = self.exchange(
+            connection, response_file, "GET /blog?page=2 HTTP/1.1"
+        )
+        self.assertEqual(status, 301)
+        self.assertEqual(headers["location"], "/blog/?page=2")
+        for path in ("/missing.html", "/empty/", "/index.html/"):
+            status, _, _ = self.exchange(
+                connection, response_file, f"GET {path} HTTP/1.1"
+            )
+            self.assertEqual(status, 404)
+
+    def test_shutdown_closes_idle_connections(self):
+        connection, response_file = self.connect()
+        status, _, _ = self.exchange(connection, response_file, "GET / HTTP/1.1")
+        self.assertEqual(status, 200)
+        self.async_server.shutdown()
+        self.async_thread.join(5)
+        self.assertFalse(self.async_thread.is_alive())
+        self.assertEqual(response_file.read(), b"")
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+
+    def file(self, name, content):
+        path = os.path.join(self.dir, name)
+        write_bytes(path, content)
+        return path
+
+    def test_evicts_least_recently_used_over_byte_budget(self):
+        cache = server.FileCache(30, max_file_size=20)
+        paths = list(map(lambda name: self.file(name, b"x" * 10), "abcd"))
+        for path in paths[:3]:
+            cache.get(path)
+        cache.get(paths[0])
+        cache.get(paths[3])
+        self.assertEqual(list(cache.entries), [paths[2], paths[0], paths[3]])
+        self.assertEqual(cache.size, 30)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    def test_changed_file_is_reloaded(self):
+        cache = server.FileCache(1 << 20)
+        path = self.file("page.html", b"first")
+        entry = cache.get(path)
+        self.assertIs(cache.get(path), entry)
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(cache.get(path), entry)
+
+        entry = cache.get(path)
+        write_bytes(path, b"second, longer")
+        os.utime(path, ns=(stat.st_atime_ns, entry.mtime_ns))
+        entry = cache.get(path)
+        self.assertEqual(entry.body, b"second, longer")
+
+        # same size and mtime, but a different file renamed into place
+        replacement = self.file("page.html.tmp", b"third, longer!")
+        os.utime(replacement, ns=(stat.st_atime_ns, entry.mtime_ns))
+        os.replace(replacement, path)
+        self.assertEqual(cache.get(path).body, b"third, longer!")
+        self.assertEqual(cache.size, len(b"third, longer!"))
+
+    def test_large_file_is_served_from_disk(self):
+        cache = server.FileCache(100, max_file_size=10)
+        path = self.file("large.bin", b"x" * 11)
+        entry = cache.get(path)
+        self.assertIsNone(entry.body)
+        self.assertEqual(entry.size, 11)
+        self.assertEqual(entry.etag, f'"{entry.mtime_ns:x}-{11:x}"')
+        self.assertEqual(cache.entries, {})
+        self.assertEqual(cache.size, 0)
+
+    def test_is_not_modified(self):
+        entry = server.FileCache(1 << 20).get(self.file("page.html", b"page"))
+        etag = entry.etag
+        modified = entry.last_modified
+        self.assertTrue(server.is_not_modified(entry, "*", None))
+        self.assertTrue(server.is_not_modified(entry, f'"other", {etag}', None))
+        self.assertTrue(server.is_not_modified(entry, f"W/{etag}", None))
+        self.assertFalse(server.is_not_modified(entry, '"other"', None))
+        # If-None-Match wins over a matching If-Modified-Since
+        self.assertFalse(server.is_not_modified(entry, '"other"', modified))
+        self.assertTrue(server.is_not_modified(entry, None, modified))
+        self.assertFalse(
+            server.is_not_modified(entry, None, "Thu, 01 Jan 1970 00:00:00 GMT")
+        )
+        self.assertFalse(server.is_not_modified(entry, None, None))
+
+
+class TestConditionalRequests(LoopbackTestCase):
+    def test_not_modified_in_both_servers(self):
+        write_bytes(os.path.join(self.dir, "index.html"), b"<p>home</p>")
+        for start in (self.start_threaded, self.start_async):
+            with self.subTest(server=start.__name__):
+                address = start(server.FileCache(1 << 20))
+                response, body = self.request(address, "/")
+                self.assertEqual(response.status, HTTPStatus.OK)
+                self.assertEqual(body, b"<p>home</p>")
+                etag = response.getheader("ETag")
+                last_modified = response.getheader("Last-Modified")
+
+                response, body = self.request(address, "/", {"If-None-Match": etag})
+                self.assertEqual(response.status, HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(body, b"")
+                response, _ = self.request(
+                    address,
+                    "/",
+                    {"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+                )
+                self.assertEqual(response.status, HTTPStatus.OK)
+
+
+class TestFingerprintedAssets(unittest.TestCase):
+    def setUp(self):
+        self.dir = temp_dir(self)
+        self.assets = server.FingerprintedAssets(self.dir)
+        self.style_path = os.path.join(self.dir, "css", "style.0123456789.css")
+        write_bytes(self.style_path, b"body {}")
+        self.page_path = os.path.join(self.dir, "release.2024011512.html")
+        write_bytes(self.page_path, b"<p>release</p>")
+
+    def write_manifest(self, urls):
+        # replaced like the build does, so the inode changes
+        path = os.path.join(self.dir, server.asset_manifest_name)
+        write_bytes(path + ".tmp", json.dumps(urls).encode())
+        os.replace(path + ".tmp", path)
+
+    def test_only_manifest_urls_are_immutable(self):
+        self.assertFalse(self.assets.is_fingerprinted(self.style_path))
+        self.write_manifest({"/css/style.css": "/css/style.0123456789.css"})
+        self.assertTrue(self.assets.is_fingerprinted(self.style_path))
+        # a hash-like name is not enough
+        self.assertFalse(self.assets.is_fingerprinted(self.page_path))
+
+        _, _, headers = server.select_representation(
+            server.FileCache(0), self.style_path, None, self.assets
+        )
+        self.assertIn(("Cache-Control", server.immutable_cache_control), headers)
+        _, _, headers = server.select_representation(
+            server.FileCache(0), self.page_path, None, self.assets
+        )
+        self.assertEqual(headers, [])
+
+    def test_manifest_is_reloaded_when_it_changes(self):
+        self.write_manifest({"/css/style.css": "/css/style.0123456789.css"})
+        self.assertTrue(self.assets.is_fingerprinted(self.style_path))
+        self.write_manifest({"/css/style.css": "/css/style.abcdefabcd.css"})
+        self.assertFalse(self.assets.is_fingerprinted(self.style_path))
+        os.remove(os.path.join(self.dir, server.asset_manifest_name))
+        self.assertFalse(self.assets.is_fingerprinted(self.style_path))
+
+    def test_unreadable_manifest_marks_nothing_immutable(self):
+        self.write_manifest(["/css/style.0123456789.css"])
+        self.assertFalse(self.assets.is_fingerprinted(self.style_path))
+
+
+class TestPrecompressed(LoopbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.page_path = os.path.join(self.dir, "index.html")
+        self.page = b"<p>home</p>" * 100
+        write_bytes(self.page_path, self.page)
+
+    def write_gzip(self, content, mtime_offset=0):
+        write_bytes(self.page_path + ".gz", gzip.compress(content, mtime=0))
+        stat = os.stat(self.page_path)
+        os.utime(
+            self.page_path + ".gz",
+            ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset),
+        )
+
+    def test_accepts_gzip(self):
+        for accept_encoding in (
+            "gzip",
+            "GZIP",
+            "deflate, gzip, br",
+            "gzip;q=0.5",
+            "gzip; Q=1.0",
+            "gzip;level=1",
+            "*",
+            "br, *;q=0.1",
+            "*;q=0, gzip",
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertTrue(server.accepts_gzip(accept_encoding))
+        for accept_encoding in (
+            None,
+            "",
+            "br",
+            "identity",
+            "gzip;q=0",
+            "gzip; q=0.000",
+            "gzip;q=bogus",
+            "*;q=0",
+            "*, gzip;q=0",
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertFalse(server.accepts_gzip(accept_encoding))
+
+    def test_vary_only_when_a_sibling_exists(self):
+        entry, content_type, headers = server.select_representation(
+            server.FileCache(0), self.page_path, "gzip"
+        )
+        self.assertEqual(entry.path, self.page_path)
+        self.assertEqual(content_type, "text/html")
+        self.assertEqual(headers, [])
+
+        self.write_gzip(self.page)
+        entry, _, headers = server.select_representation(
+            server.FileCache(0), self.page_path, None
+        )
+        self.assertEqual(entry.path, self.page_path)
+        self.assertEqual(headers, [("Vary", "Accept-Encoding")])
+
+    def test_gzip_sibling_is_selected(self):
+        self.write_gzip(self.page)
+        entry, content_type, headers = server.select_representation(
+            server.FileCache(0), self.page_path, "gzip, br"
+        )
+        self.assertEqual(entry.path, self.page_path + ".gz")
+        self.assertEqual(content_type, "text/html")
+        self.assertEqual(
+            headers, [("Vary", "Accept-Encoding"), ("Content-Encoding", "gzip")]
+        )
+
+    def test_stale_gzip_sibling_falls_back(self):
+        self.write_gzip(b"<p>old</p>", mtime_offset=-(10**9))
+        entry, _, headers = server.select_representation(
+            server.FileCache(0), self.page_path, "gzip"
+        )
+        self.assertEqual(entry.path, self.page_path)
+        self.assertEqual(headers, [("Vary", "Accept-Encoding")])
+
+    def test_gzip_response_in_both_servers(self):
+        self.write_gzip(self.page)
+        for start in (self.start_threaded, self.start_async):
+            with self.subTest(server=start.__name__):
+                address = start()
+                response, body = self.request(address, "/", {"Accept-Encoding": "gzip"})
+                self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+                self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+                self.assertEqual(gzip.decompress(body), self.page)
+                response, body = self.request(address, "/")
+                self.assertIsNone(response.getheader("Content-Encoding"))
+                self.assertEqual(body, self.page)
+
+
+class TestRanges(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.path = os.path.join(tmp_dir, "data.txt")
+        write_bytes(self.path, b"0123456789" * 10)
+        self.entry = server.FileCache(1 << 20).get(self.path)
+
+    def test_parse_ranges(self):
+        self.assertEqual(server.parse_ranges("bytes=0-9", 100), [(0, 9)])
+        self.assertEqual(server.parse_ranges("bytes=90-", 100), [(90, 99)])
+        self.assertEqual(server.parse_ranges("bytes=95-200", 100), [(95, 99)])
+        self.assertEqual(server.parse_ranges("bytes=-10", 100), [(90, 99)])
+        self.assertEqual(server.parse_ranges("bytes=-500", 100), [(0, 99)])
+        self.assertEqual(server.parse_ranges("Bytes=0-0, 5-9", 100), [(0, 0), (5, 9)])
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(server.parse_ranges("bytes=-0", 100), [])
+        self.assertEqual(server.parse_ranges("bytes=100-", 100), [])
+        self.assertEqual(server.parse_ranges("bytes=0-", 0), [])
+        self.assertEqual(server.parse_ranges("bytes=-5", 0), [])
+
+    def test_invalid_ranges_are_ignored(self):
+        self.assertIsNone(server.parse_ranges("items=0-9", 100))
+        self.assertIsNone(server.parse_ranges("bytes=5-2", 100))
+        self.assertIsNone(server.parse_ranges("bytes=a-b", 100))
+        self.assertIsNone(server.parse_ranges("bytes=5", 100))
+        ranges = ",".join(["0-0"] * server.max_ranges)
+        self.assertEqual(
+            len(server.parse_ranges(f"bytes={ranges}", 100)), server.max_ranges
+        )
+        self.assertIsNone(server.parse_ranges(f"bytes={ranges},1-1", 100))
+
+    def test_single_range(self):
+        status, headers, pieces = server.range_response(
+            self.entry, "text/plain", "bytes=10-19", None
+        )
+        self.assertEqual(status, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(dict(headers)["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(pieces, [(10, 10)])
+        self.assertEqual(bytes(self.body(pieces)), b"0123456789")
+
+    def test_no_or_ignored_range_sends_whole_file(self):
+        for range_header in (
+            None,
+            "bytes=5-2",
+            "bytes=" + "0-0," * server.max_ranges + "1-1",
+        ):
+            status, headers, pieces = server.range_response(
+                self.entry, "text/plain", range_header, None
+            )
+            self.assertEqual(status, HTTPStatus.OK)
+            self.assertEqual(dict(headers)["Accept-Ranges"], "bytes")
+            self.assertEqual(pieces, [(0, 100)])
+
+    def test_unsatisfiable_range_response(self):
+        status, headers, pieces = server.range_response(
+            self.entry, "text/plain", "bytes=200-", None
+        )
+        self.assertEqual(status, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(headers, [("Content-Range", "bytes */100")])
+        self.assertEqual(pieces, [])
+
+        empty_path = os.path.join(os.path.dirname(self.path), "empty.txt")
+        write_bytes(empty_path, b"")
+        empty_entry = server.FileCache(1 << 20).get(empty_path)
+        status, headers, _ = server.range_response(
+            empty_entry, "text/plain", "bytes=0-", None
+        )
+        self.assertEqual(status, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(headers, [("Content-Range", "bytes */0")])
+
+    def test_multipart_framing(self):
+        status, headers, pieces = server.range_response(
+            self.entry, "text/plain", "bytes=0-1,98-", None
+        )
+        self.assertEqual(status, HTTPStatus.PARTIAL_CONTENT)
+        content_type = dict(headers)["Content-Type"]
+        self.assertTrue(content_type.startswith("multipart/byteranges; boundary="))
+        boundary = content_type.partition("boundary=")[2]
+        body = self.body(pieces)
+        self.assertEqual(
+            body,
+            (
+                f"--{boundary}\r\nContent-Type: text/plain\r\n"
+                "Content-Range: bytes 0-1/100\r\n\r\n01\r\n"
+                f"--{boundary}\r\nContent-Type: text/plain\r\n"
+                "Content-Range: bytes 98-99/100\r\n\r\n89\r\n"
+                f"--{boundary}--\r\n"
+            ).encode(),
+        )
+        self.assertEqual(server.content_length(pieces), len(body))
+
+    def test_if_range(self):
+        self.assertTrue(server.if_range_matches(self.entry, None))
+        self.assertTrue(server.if_range_matches(self.entry, self.entry.etag))
+        self.assertTrue(server.if_range_matches(self.entry, self.entry.last_modified))
+        self.assertFalse(server.if_range_matches(self.entry, "W/" + self.entry.etag))
+        self.assertFalse(server.if_range_matches(self.entry, '"other"'))
+        self.assertFalse(
+            server.if_range_matches(self.entry, "Thu, 01 Jan 1970 00:00:00 GMT")
+        )
+        status, _, pieces = server.range_response(
+            self.entry, "text/plain", "bytes=0-9", '"other"'
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(pieces, [(0, 100)])
+
+    def body(self, pieces):
+        return b"".join(
+            map(lambda piece: bytes(server.piece_bytes(piece, self.entry.body)), pieces)
+        )
+
+
+class TestRangeRequests(LoopbackTestCase):
+    def test_partial_content_in_both_servers(self):
+        data = os.urandom(1 << 16)
+        write_bytes(os.path.join(self.dir, "data.bin"), data)
+        for start in (self.start_threaded, self.start_async):
+            with self.subTest(server=start.__name__):
+                address = start()
+                response, body = self.request(
+                    address, "/data.bin", {"Range": "bytes=1000-1999"}
+                )
+                self.assertEqual(response.status, HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(
+                    response.getheader("Content-Range"), f"bytes 1000-1999/{len(data)}"
+                )
+                self.assertEqual(body, data[1000:2000])
+
+                response, body = self.request(
+                    address, "/data.bin", {"Range": "bytes=0-3,-4"}
+                )
+                self.assertEqual(response.status, HTTPStatus.PARTIAL_CONTENT)
+                self.assertEqual(int(response.getheader("Content-Length")), len(body))
+                self.assertIn(data[:4] + b"\r\n", body)
+                self.assertIn(data[-4:] + b"\r\n", body)
+
+                response, body = self.request(
+                    address, "/data.bin", {"Range": "bytes=99999-"}
+                )
+                self.assertEqual(
+                    response.status, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+                )
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "prefork workers need os.fork")
+class TestPrefork(LoopbackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.workers_dir = os.path.join(self.dir, "workers")
+        self.dir = os.path.join(self.dir, "site")
+        write_bytes(os.path.join(self.dir, "index.html"), b"home")
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.addCleanup(self.sock.close)
+        self.address = self.sock.getsockname()
+
+    def serve(self):
+        # every worker leaves its pid behind as it starts
+        write_bytes(os.path.join(self.workers_dir, str(os.getpid())), b"")
+        handler_class = type(
+            "Handler", (QuietHandler,), {"file_cache": server.FileCache(0)}
+        )
+        httpd = server.listening_server(
+            ThreadingHTTPServer,
+            functools.partial(handler_class, directory=self.dir),
+            self.sock,
+        )
+        server.serve_until_stopped(httpd, server.worker_stop_signals)
+
+    def start_supervisor(self, workers, serve, shutdown_timeout=None):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 1
+            try:
+                devnull = os.open(os.devnull, os.O_WRONLY)
+                # the supervisor's messages would land between the test results
+                os.dup2(devnull, 1)
+                os.dup2(devnull, 2)
+                # restarts of workers that just started aren't delayed
+                server.min_worker_uptime = 0
+                if shutdown_timeout is not None:
+                    server.shutdown_timeout = shutdown_timeout
+                server.prefork(workers, serve)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+        # only the workers accept, so connections are refused once they stop
+        self.sock.close()
+        self.addCleanup(self.stop_supervisor, pid)
+        return pid
+
+    def stop_supervisor(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+            self.wait_for_exit(pid)
+        except ProcessLookupError:
+            pass
+        finally:
+            # a failed test mustn't leave workers behind
+            for worker in self.worker_pids():
+                try:
+                    os.kill(worker, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def worker_pids(self):
+        if not os.path.isdir(self.workers_dir):
+            return []
+        return list(map(int, os.listdir(self.workers_dir)))
+
+    def wait_for_exit(self, pid):
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            waited, status = os.waitpid(pid, os.WNOHANG)
+            if waited:
+                return os.waitstatus_to_exitcode(status)
+            time.sleep(0.05)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        self.fail(f"supervisor {pid} didn't stop")
+
+    def wait_for_workers(self, count):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            pids = self.worker_pids()
+            if len(pids) >= count:
+                return pids
+            time.sleep(0.05)
+        self.fail(f"{count} worker(s) didn't start")
+
+    def assert_stopped(self, pids):
+        for pid in pids:
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
+        with self.assertRaises(ConnectionRefusedError):
+            socket.create_connection(self.address, timeout=5).close()
+
+    def test_killed_worker_is_replaced(self):
+        supervisor = self.start_supervisor(2, self.serve)
+        workers = self.wait_for_workers(2)
+        os.kill(workers[0], signal.SIGKILL)
+        for _ in range(5):
+            response, body = self.request(self.address, "/")
+            self.assertEqual((response.status, body), (HTTPStatus.OK, b"home"))
+
+        replacement = set(self.wait_for_workers(3)) - set(workers)
+        self.assertEqual(len(replacement), 1)
+        response, body = self.request(self.address, "/")
+        self.assertEqual(body, b"home")
+
+        os.kill(supervisor, signal.SIGTERM)
+        self.assertEqual(self.wait_for_exit(supervisor), 0)
+        self.assert_stopped(workers + list(replacement))
+
+    def test_worker_ignoring_sigterm_is_killed(self):
+        def serve():
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            write_bytes(os.path.join(self.workers_dir, str(os.getpid())), b"")
+            while True:
+                time.sleep(1)
+
+        supervisor = self.start_supervisor(1, serve, shutdown_timeout=0)
+        workers = self.wait_for_workers(1)
+        os.kill(supervisor, signal.SIGTERM)
+        self.assertEqual(self.wait_for_exit(supervisor), 0)
+        self.assert_stopped(workers)
+
+
+if __name__ == "__main__":
+    unittest.main()
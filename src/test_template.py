@@ -0,0 +1,136 @@
+import io
+import os
+import unittest
+
+from fingerprint import AssetManifest
+from fixtures import temp_dir, write_file
+from htmlnode import LeafNode, ParentNode
+from template import TemplateSet, compile_template, compile_template_string
+
+
+class TestTemplate(unittest.TestCase):
+    content_node = ParentNode(
+        "div", [ParentNode("h1", [LeafNode(None, "header text")])]
+    )
+
+    def render(self, template):
+        file = io.StringIO()
+        template.render(file, "header text", self.content_node)
+        return file.getvalue()
+
+    def test_render(self):
+        template = compile_template_string(
+            "<title>{{ Title }}</title><body>{{ Content }}</body>"
+        )
+        self.assertEqual(
+            self.render(template),
+            "<title>header text</title><body><div><h1>header text</h1></div></body>",
+        )
+
+    def test_render_title_after_content(self):
+        template = compile_template_string("{{ Content }}<footer>{{ Title }}</footer>")
+        self.assertEqual(
+            self.render(template),
+            "<div><h1>header text</h1></div><footer>header text</footer>",
+        )
+
+    def test_segments(self):
+        template = compile_template_string(
+            "<h1>{{Title}}</h1>{{ Site }}{{ Content }}", variables={"Site": "Blog"}
+        )
+        self.assertEqual(
+            template.segments,
+            [("<h1>", "Title"), ("</h1>Blog", "Content"), ("", None)],
+        )
+
+    def test_unknown_variable(self):
+        with self.assertRaisesRegex(ValueError, "Unknown template variable Site"):
+            compile_template_string("{{ Site }}")
+
+    def test_site_variable_cannot_replace_page_variable(self):
+        with self.assertRaisesRegex(ValueError, "Site variable Title is reserved"):
+            compile_template_string(
+                "<title>{{ Title }}</title>{{ Content }}",
+                variables={"Title": "Site"},
+            )
+
+    def test_hash_depends_on_variables(self):
+        first = compile_template_string("{{ Site }}", variables={"Site": "a"})
+        second = compile_template_string("{{ Site }}", variables={"Site": "b"})
+        self.assertNotEqual(first.hash, second.hash)
+
+    def test_asset_urls_are_fingerprinted(self):
+        content = '<link href="/index.css" rel="stylesheet">{{ Content }}'
+        plain = compile_template_string(content)
+        first = compile_template_string(
+            content, assets=AssetManifest({"/index.css": "/index.0123456789.css"})
+        )
+        second = compile_template_string(
+            content, assets=AssetManifest({"/index.css": "/index.abcdefabcd.css"})
+        )
+        self.assertEqual(
+            first.segments[0][0], '<link href="/index.0123456789.css" rel="stylesheet">'
+        )
+        self.assertEqual(len(set([plain.hash, first.hash, second.hash])), 3)
+
+
+class TestPartials(unittest.TestCase):
+    def setUp(self):
+        self.root = temp_dir(self)
+        self.template_path = os.path.join(self.root, "template.html")
+        write_file(self.template_path, "{{> partials/head.html }}{{ Content }}")
+        write_file(
+            os.path.join(self.root, "partials", "head.html"),
+            "<title>{{ Title }}</title>{{> nav.html }}",
+        )
+        write_file(os.path.join(self.root, "partials", "nav.html"), "<nav></nav>")
+
+    def test_partials_are_inlined(self):
+        template = compile_template(self.template_path)
+        self.assertEqual(
+            template.segments,
+            [("<title>", "Title"), ("</title><nav></nav>", "Content"), ("", None)],
+        )
+
+    def test_partial_change_changes_hash(self):
+        first = compile_template(self.template_path)
+        write_file(os.path.join(self.root, "partials", "nav.html"), "<nav>x</nav>")
+        self.assertNotEqual(compile_template(self.template_path).hash, first.hash)
+
+    def test_partial_cycle(self):
+        write_file(os.path.join(self.root, "partials", "nav.html"), "{{> head.html }}")
+        with self.assertRaisesRegex(ValueError, "includes itself"):
+            compile_template(self.template_path)
+
+
+class TestTemplateSet(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = temp_dir(self)
+        self.content_dir = os.path.join(tmp_dir, "content")
+        self.default_path = os.path.join(tmp_dir, "template.html")
+        self.blog_template_path = os.path.join(
+            self.content_dir, "blog", "template.html"
+        )
+        write_file(self.default_path, "default {{ Content }}")
+        write_file(self.blog_template_path, "blog {{ Content }}")
+        self.templates = TemplateSet(self.default_path, self.content_dir)
+
+    def test_directory_override(self):
+        template_path = lambda *path: self.templates.template_for(
+            os.path.join(self.content_dir, *path)
+        ).path
+        self.assertEqual(template_path("index.md"), self.default_path)
+        self.assertEqual(template_path("blog", "post.md"), self.blog_template_path)
+        self.assertEqual(
+            template_path("blog", "2024", "post.md"), self.blog_template_path
+        )
+        self.assertEqual(template_path("docs", "guide.md"), self.default_path)
+
+    def test_templates_are_compiled_once(self):
+        first = self.templates.template_for(os.path.join(self.content_dir, "a.md"))
+        second = self.templates.template_for(os.path.join(self.content_dir, "b.md"))
+        self.assertIs(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
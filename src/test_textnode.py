@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode
+from textnode import TextNode, TextType, text_type_bold
 
 
 class TestTextNode(unittest.TestCase):
@@ -24,6 +24,20 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(repr(node), "TextNode(some node, bold, www.url.com)")
         self.assertEqual(repr(node2), "TextNode(some other node, italic, None)")
 
+    def test_has_no_instance_dict(self):
+        node = TextNode("some node", text_type_bold)
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_text_type_is_int_with_readable_name(self):
+        self.assertEqual(text_type_bold, TextType.BOLD)
+        self.assertIsInstance(text_type_bold, int)
+        self.assertEqual(str(text_type_bold), "BOLD")
+        self.assertEqual(f"{text_type_bold}", "BOLD")
+        self.assertEqual(
+            repr(TextNode("some node", text_type_bold)),
+            "TextNode(some node, BOLD, None)",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
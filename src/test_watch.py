@@ -0,0 +1,104 @@
+import os
+import unittest
+
+from fixtures import temp_dir, write_file
+from watch import (
+    changed_paths,
+    classify_changes,
+    is_in_dir,
+    live_reload_stamp,
+    snapshot,
+    write_live_reload_stamp,
+)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.root = temp_dir(self)
+        self.content_dir = os.path.join(self.root, "content")
+        self.page_path = os.path.join(self.content_dir, "blog", "post.md")
+        self.template_path = os.path.join(self.root, "template.html")
+        write_file(self.page_path, "# Post")
+        write_file(self.template_path, "{{ Content }}")
+
+    def test_snapshot_lists_files_and_dirs(self):
+        files = snapshot([self.content_dir, self.template_path])
+        self.assertEqual(set(files), {self.page_path, self.template_path})
+
+    def test_snapshot_ignores_missing_paths(self):
+        self.assertEqual(snapshot([os.path.join(self.root, "missing")]), {})
+
+    def test_changed_paths(self):
+        old = snapshot([self.content_dir, self.template_path])
+        write_file(self.page_path, "# Edited post")
+        new_page_path = os.path.join(self.content_dir, "index.md")
+        write_file(new_page_path, "# Home")
+        os.remove(self.template_path)
+        new = snapshot([self.content_dir, self.template_path])
+        self.assertEqual(
+            changed_paths(old, new),
+            {self.page_path, new_page_path, self.template_path},
+        )
+
+    def test_unchanged_snapshot(self):
+        old = snapshot([self.content_dir])
+        self.assertEqual(changed_paths(old, snapshot([self.content_dir])), set())
+
+    def test_write_live_reload_stamp(self):
+        public_dir = os.path.join(self.root, "public")
+        write_live_reload_stamp(public_dir)
+        self.assertTrue(os.path.exists(os.path.join(public_dir, live_reload_stamp)))
+
+
+class TestIsInDir(unittest.TestCase):
+    def test_is_in_dir(self):
+        self.assertTrue(is_in_dir("./static/index.css", "./static"))
+        self.assertTrue(is_in_dir("./static/images/a.png", "./static"))
+        self.assertFalse(is_in_dir("./static_old/index.css", "./static"))
+        self.assertFalse(is_in_dir("./template.html", "./static"))
+
+
+class TestClassifyChanges(unittest.TestCase):
+    def classify(self, *changed, fingerprint=False):
+        return classify_changes(
+            set(changed),
+            "./content",
+            "./static",
+            "./template.html",
+            "./partials",
+            fingerprint,
+        )
+
+    def test_static_change(self):
+        self.assertEqual(self.classify("./static/index.css"), (True, False, []))
+
+    def test_static_change_with_fingerprints_changes_templates(self):
+        self.assertEqual(
+            self.classify("./static/index.css", fingerprint=True), (True, True, [])
+        )
+
+    def test_page_change(self):
+        self.assertEqual(
+            self.classify("./content/blog/post.md", "./content/index.md"),
+            (False, False, ["./content/blog/post.md", "./content/index.md"]),
+        )
+
+    def test_directory_template_change(self):
+        self.assertEqual(
+            self.classify("./content/blog/template.html"),
+            (False, True, ["./content/blog/template.html"]),
+        )
+
+    def test_template_and_partial_changes(self):
+        self.assertEqual(self.classify("./template.html"), (False, True, []))
+        self.assertEqual(self.classify("./partials/header.html"), (False, True, []))
+
+    def test_unrelated_change(self):
+        self.assertEqual(
+            self.classify("./contents/index.md", "./static_old/a.css"),
+            (False, False, []),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
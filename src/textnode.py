@@ -1,12 +1,29 @@
-text_type_text = "TEXT"
-text_type_bold = "BOLD"
-text_type_italic = "ITALIC"
-text_type_code = "CODE"
-text_type_link = "LINK"
-text_type_image = "IMAGE"
+from enum import IntEnum
+
+
+class TextType(IntEnum):
+    TEXT = 0
+    BOLD = 1
+    ITALIC = 2
+    CODE = 3
+    LINK = 4
+    IMAGE = 5
+
+    def __str__(self):
+        return self.name
+
+
+text_type_text = TextType.TEXT
+text_type_bold = TextType.BOLD
+text_type_italic = TextType.ITALIC
+text_type_code = TextType.CODE
+text_type_link = TextType.LINK
+text_type_image = TextType.IMAGE
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
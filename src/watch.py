@@ -0,0 +1,76 @@
+import os
+import time
+
+from output_file import temp_path
+
+# touched after every watch-mode rebuild, server.py --live-reload polls it
+live_reload_stamp = ".livereload"
+
+
+def snapshot(paths):
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            __add_file(files, path)
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                __add_file(files, os.path.join(dir_path, file_name))
+    return files
+
+
+def __add_file(files, path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return
+    files[path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def changed_paths(old_snapshot, new_snapshot):
+    changed = set()
+    for path, signature in new_snapshot.items():
+        if old_snapshot.get(path) != signature:
+            changed.add(path)
+    changed.update(old_snapshot.keys() - new_snapshot.keys())
+    return changed
+
+
+def watch(paths, on_change, interval=0.2):
+    previous = snapshot(paths)
+    while True:
+        time.sleep(interval)
+        current = snapshot(paths)
+        changed = changed_paths(previous, current)
+        if changed:
+            on_change(changed, current)
+        previous = current
+
+
+def is_in_dir(path, dir_path):
+    return path.startswith(os.path.join(dir_path, ""))
+
+
+def classify_changes(
+    changed, content_dir, static_dir, template_path, partials_dir, fingerprint=False
+):
+    static_changed = any(map(lambda path: is_in_dir(path, static_dir), changed))
+    changed_content = sorted(filter(lambda path: is_in_dir(path, content_dir), changed))
+    # anything but a page in content is a directory template or a partial,
+    # and new asset fingerprints change every template hash
+    template_changed = (
+        template_path in changed
+        or any(map(lambda path: is_in_dir(path, partials_dir), changed))
+        or any(map(lambda path: not path.endswith(".md"), changed_content))
+        or (static_changed and fingerprint)
+    )
+    return static_changed, template_changed, changed_content
+
+
+def write_live_reload_stamp(public_dir):
+    os.makedirs(public_dir, exist_ok=True)
+    stamp_path = os.path.join(public_dir, live_reload_stamp)
+    # replaced rather than rewritten, like every other output
+    tmp_path = temp_path(stamp_path)
+    with open(tmp_path, "w") as stamp_file:
+        stamp_file.write(str(time.time_ns()))
+    os.replace(tmp_path, stamp_path)